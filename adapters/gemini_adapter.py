@@ -1,17 +1,35 @@
-import requests
+from typing import Iterator
+from adapters.streaming import iter_sse_json
+from adapters.transport import get_transport
+
+BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
 
 
 class GeminiAdapter:
-    def generate(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> str:
+    def __init__(self):
+        self.transport = get_transport("gemini")
+
+    def _payload(self, api_key: str, prompt: str, temperature: float):
         if not api_key:
             raise ValueError("Gemini API key required")
-        model_name = model or "gemini-1.5-flash"
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent"
-        payload = {
+        return {
             "contents": [{"parts": [{"text": prompt}]}],
             "generationConfig": {"temperature": temperature},
         }
-        response = requests.post(url, params={"key": api_key}, json=payload, timeout=60)
-        response.raise_for_status()
+
+    def generate(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> str:
+        payload = self._payload(api_key, prompt, temperature)
+        url = f"{BASE_URL}/{model or 'gemini-1.5-flash'}:generateContent"
+        response = self.transport.post(url, params={"key": api_key}, json=payload)
         data = response.json()
         return data["candidates"][0]["content"]["parts"][0]["text"].strip()
+
+    def stream(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> Iterator[str]:
+        payload = self._payload(api_key, prompt, temperature)
+        url = f"{BASE_URL}/{model or 'gemini-1.5-flash'}:streamGenerateContent"
+        response = self.transport.post(url, params={"key": api_key, "alt": "sse"}, json=payload, stream=True)
+        for event in iter_sse_json(response):
+            for candidate in event.get("candidates", []):
+                for part in (candidate.get("content") or {}).get("parts", []):
+                    if part.get("text"):
+                        yield part["text"]
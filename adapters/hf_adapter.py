@@ -1,7 +1,10 @@
-import requests
+from adapters.transport import get_transport
 
 
 class HuggingFaceAdapter:
+    def __init__(self):
+        self.transport = get_transport("huggingface")
+
     def generate(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> str:
         if not api_key:
             raise ValueError("HuggingFace API key required")
@@ -9,8 +12,7 @@ class HuggingFaceAdapter:
         url = f"https://api-inference.huggingface.co/models/{model_name}"
         headers = {"Authorization": f"Bearer {api_key}"}
         payload = {"inputs": prompt, "parameters": {"temperature": temperature}}
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
+        response = self.transport.post(url, headers=headers, json=payload)
         data = response.json()
         if isinstance(data, list) and data:
             return data[0].get("generated_text", "").strip()
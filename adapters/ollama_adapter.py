@@ -1,16 +1,33 @@
-import requests
+from typing import Iterator
+from adapters.streaming import iter_ndjson
+from adapters.transport import get_transport
 
 
 class OllamaAdapter:
-    def generate(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> str:
+    def __init__(self):
+        self.transport = get_transport("ollama", read_timeout=120)
+
+    def _request(self, model: str, prompt: str, temperature: float, stream: bool):
         model_name = model or "llama3"
         url = "http://localhost:11434/api/generate"
         payload = {
             "model": model_name,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
             "options": {"temperature": temperature},
         }
-        response = requests.post(url, json=payload, timeout=120)
-        response.raise_for_status()
+        return url, payload
+
+    def generate(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> str:
+        url, payload = self._request(model, prompt, temperature, stream=False)
+        response = self.transport.post(url, json=payload)
         return response.json().get("response", "").strip()
+
+    def stream(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> Iterator[str]:
+        url, payload = self._request(model, prompt, temperature, stream=True)
+        response = self.transport.post(url, json=payload, stream=True)
+        for event in iter_ndjson(response):
+            if event.get("response"):
+                yield event["response"]
+            if event.get("done"):
+                return
@@ -1,8 +1,13 @@
-import requests
+from typing import Iterator
+from adapters.streaming import iter_sse_json
+from adapters.transport import get_transport
 
 
 class OpenAIAdapter:
-    def generate(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> str:
+    def __init__(self):
+        self.transport = get_transport("openai")
+
+    def _request(self, model: str, api_key: str, prompt: str, temperature: float):
         if not api_key:
             raise ValueError("OpenAI API key required")
         url = "https://api.openai.com/v1/chat/completions"
@@ -12,6 +17,18 @@ class OpenAIAdapter:
             "messages": [{"role": "user", "content": prompt}],
             "temperature": temperature,
         }
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
+        return url, headers, payload
+
+    def generate(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> str:
+        url, headers, payload = self._request(model, api_key, prompt, temperature)
+        response = self.transport.post(url, headers=headers, json=payload)
         return response.json()["choices"][0]["message"]["content"].strip()
+
+    def stream(self, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> Iterator[str]:
+        url, headers, payload = self._request(model, api_key, prompt, temperature)
+        response = self.transport.post(url, headers=headers, json={**payload, "stream": True}, stream=True)
+        for event in iter_sse_json(response):
+            for choice in event.get("choices", []):
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    yield content
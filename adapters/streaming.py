@@ -0,0 +1,22 @@
+import json
+from typing import Dict, Iterator
+
+import requests
+
+
+def iter_sse_json(response: requests.Response) -> Iterator[Dict]:
+    with response:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            yield json.loads(data)
+
+
+def iter_ndjson(response: requests.Response) -> Iterator[Dict]:
+    with response:
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,188 @@
+import bisect
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            # Once the cool-down has passed, a single probe is let through; everyone else waits for its outcome.
+            if time.monotonic() - self.opened_at < self.reset_seconds or self._probing:
+                raise CircuitOpenError("Provider circuit is open after repeated failures")
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        with self._lock:
+            self._probing = False
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> Dict:
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {"buckets": dict(zip(labels, self.counts)), "sum": round(self.total, 4), "count": self.count}
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+class ProviderTransport:
+    def __init__(self, provider: str, pool_size: int = 8, max_retries: int = MAX_RETRIES,
+                 read_timeout: float = READ_TIMEOUT):
+        self.provider = provider
+        self.max_retries = max_retries
+        self.read_timeout = read_timeout
+        self.breaker = CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.latency = Histogram()
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, elapsed: float, error: Optional[str] = None):
+        with self._lock:
+            self.latency.observe(elapsed)
+            if error:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", (CONNECT_TIMEOUT, self.read_timeout))
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            start = time.monotonic()
+            try:
+                response = self.session.post(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                self._record(time.monotonic() - start, type(exc).__name__)
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            except Exception:
+                # Not a provider failure (e.g. an invalid URL), but a half-open probe must still give up its slot.
+                self.breaker.release()
+                raise
+            elapsed = time.monotonic() - start
+            if response.status_code in RETRY_STATUSES:
+                self._record(elapsed, str(response.status_code))
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+                delay = retry_after_seconds(response)
+                response.close()
+                time.sleep(min(BACKOFF_MAX_SECONDS, delay) if delay is not None else backoff_delay(attempt))
+                attempt += 1
+                continue
+            self._record(elapsed, str(response.status_code) if response.status_code >= 400 else None)
+            self.breaker.record_success()
+            response.raise_for_status()
+            return response
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "latency_seconds": self.latency.snapshot(),
+                "errors": dict(self.errors),
+                "circuit": self.breaker.state,
+            }
+
+
+_transports: Dict[str, ProviderTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(provider: str, **kwargs) -> ProviderTransport:
+    with _transports_lock:
+        transport = _transports.get(provider)
+        if transport is None:
+            transport = ProviderTransport(provider, **kwargs)
+            _transports[provider] = transport
+        return transport
+
+
+def transport_stats(providers: Optional[List[str]] = None) -> Dict[str, Dict]:
+    with _transports_lock:
+        selected = {p: t for p, t in _transports.items() if providers is None or p in providers}
+    return {provider: transport.stats() for provider, transport in selected.items()}
@@ -0,0 +1,92 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Set, Tuple
+from db import (
+    list_sessions, iter_results, alerted_researchers, save_alerts, update_alert_watermarks,
+)
+from search import discover, paper_key
+from matcher import build_researcher_profiles, rank_researchers, session_interest_vectors
+
+ALERT_THRESHOLD = float(os.environ.get("ALERT_THRESHOLD", "0.55"))
+ALERT_TOPICS_PER_SESSION = 5
+ALERT_PAPERS_PER_TOPIC = 25
+INITIAL_LOOKBACK_DAYS = 7
+
+
+def session_topics(session: Dict) -> List[str]:
+    # Returned exactly as run_search received them, so the stored session embeddings stay valid.
+    topics = json.loads(session.get("refined") or "[]")
+    if not topics:
+        topics = (json.loads(session.get("interests") or "{}") or {}).get("topics", [])
+    return list(topics)
+
+
+def alert_queries(session: Dict) -> List[str]:
+    return [t.strip() for t in session_topics(session) if t and t.strip()][:ALERT_TOPICS_PER_SESSION]
+
+
+def _watermark(session: Dict, now: datetime) -> datetime:
+    if session.get("alert_watermark"):
+        return datetime.fromisoformat(session["alert_watermark"])
+    return now - timedelta(days=INITIAL_LOOKBACK_DAYS)
+
+
+def fetch_new_papers(topic_since: Dict[str, datetime]) -> Tuple[Dict[str, List[Dict]], Set[str]]:
+    papers_by_topic, failed = {}, set()
+    for topic, since in topic_since.items():
+        report = {}
+        papers_by_topic[topic] = discover(topic, limit=ALERT_PAPERS_PER_TOPIC, since=since, report=report)
+        if report["failed"]:
+            failed.add(topic)
+    return papers_by_topic, failed
+
+
+def run_alerts(now: datetime = None):
+    now = now or datetime.utcnow()
+    sessions = [s for s in list_sessions() if alert_queries(s)]
+    topic_since: Dict[str, datetime] = {}
+    for session in sessions:
+        since = _watermark(session, now)
+        for topic in alert_queries(session):
+            key = topic.lower()
+            topic_since[key] = min(topic_since.get(key, since), since)
+    papers_by_topic, failed_topics = fetch_new_papers(topic_since)
+
+    alerts = []
+    for session in sessions:
+        topics = session_topics(session)
+        since = _watermark(session, now).date().isoformat()
+        papers = {}
+        for topic in alert_queries(session):
+            for paper in papers_by_topic.get(topic.lower(), []):
+                if paper.get("published", "") >= since or not paper.get("published"):
+                    papers.setdefault(paper_key(paper), paper)
+        if not papers:
+            continue
+        known = alerted_researchers(session["id"])
+        for result in iter_results(session["id"]):
+            known.update([result["name"]] + result.get("aliases", []))
+        candidates = [
+            r for r in build_researcher_profiles(list(papers.values()))
+            if known.isdisjoint([r["name"]] + r["aliases"])
+        ]
+        countries = json.loads(session.get("countries") or "[]")
+        interest_vector, topic_vectors = session_interest_vectors(session["id"], topics)
+        ranked = rank_researchers(
+            candidates, topics, countries, interest_vector=interest_vector, topic_vectors=topic_vectors
+        )
+        for researcher in ranked:
+            if researcher["match_score"] < ALERT_THRESHOLD:
+                continue
+            title = researcher["papers"][0].get("title", "")
+            message = f"New match: {researcher['name']} ({researcher['match_score']:.2f}) - {title}"
+            alerts.append((session["id"], message, researcher["name"]))
+    save_alerts(alerts)
+    # A session whose topics were not all fetched keeps its watermark so the window is retried next run;
+    # researchers alerted in the meantime are skipped via alerted_researchers.
+    update_alert_watermarks([
+        (now.isoformat(), s["id"]) for s in sessions
+        if failed_topics.isdisjoint(t.lower() for t in alert_queries(s))
+    ])
+    return alerts
@@ -1,37 +1,105 @@
 import os
 import json
+import logging
+import time
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash
+from typing import Callable, Iterator
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, stream_with_context, g
 from apscheduler.schedulers.background import BackgroundScheduler
-import pandas as pd
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from nlp import extract_text_from_pdf, build_interest_profile, ask_clarifying_questions, refine_interest_vector
-from search import search_arxiv, search_semantic_scholar
-from matcher import build_researcher_profiles, rank_researchers
-from scraper import enrich_researcher
-from llm_router import redact_key
-from db import init_db, save_session, save_results, get_results, list_sessions, save_alert
-from pyvis.network import Network
+from pdf_text import PDF_MAX_BYTES, PDFTooLarge
+from nlp import extract_text_from_pdf, build_interest_profile, stream_clarifying_questions, refine_interest_vector, cache_stats, backend_stats, warm_up
+from jobs import submit_search, cancel, resume_jobs, TERMINAL_STATUSES
+from alert_engine import run_alerts
+from llm_router import redact_key, provider_stats, call_llm_stream
+from db import init_db, save_session, update_session_search, get_results, get_result, iter_results, count_results, get_job, list_sessions
+from exporters import stream_csv, stream_ndjson, stream_pdf, stream_parquet
+from metrics import begin_trace, end_trace, register_collector, render_prometheus, stats_collector
+from scraper import ROBOTS
+from matcher import HYBRID_RANKING
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-key")
 
 UPLOAD_FOLDER = "uploads"
+UPLOAD_FORM_MAX_BYTES = 64 * 1024
+DEFAULT_QUESTIONS = "Provide any additional research interests or methods you'd like to emphasize."
+JOB_EVENT_INTERVAL_SECONDS = 0.5
+RESULTS_PAGE_SIZE = 50
+PRELOAD_MODEL = os.environ.get("PRELOAD_MODEL", "0") == "1"
+LLM_ERROR_MESSAGE = "The language model request failed ({}). Please try again later."
+logger = logging.getLogger("app")
+# Reject oversized uploads before Flask buffers them; the form fields get a little room beside the PDF.
+app.config["MAX_CONTENT_LENGTH"] = PDF_MAX_BYTES + UPLOAD_FORM_MAX_BYTES
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+if PRELOAD_MODEL:
+    warm_up()
 
 
-def generate_graph(researchers):
-    net = Network(height="500px", width="100%", bgcolor="#ffffff")
-    for researcher in researchers:
-        net.add_node(researcher["name"], label=researcher["name"])
-        for paper in researcher.get("papers", [])[:3]:
-            title = paper.get("title", "Paper")
-            net.add_node(title, label=title, color="#97c2fc")
-            net.add_edge(researcher["name"], title)
-    output_path = os.path.join("static", "graph.html")
-    net.write_html(output_path)
-    return output_path
+def _background_path(session_id: int) -> str:
+    return os.path.join(UPLOAD_FOLDER, f"session_{session_id}_background.txt")
+
+
+def _provider_samples():
+    for provider, stats in provider_stats().items():
+        if provider == "cache":
+            for key, value in stats.items():
+                yield f"llm_cache_{key}", {}, value
+            continue
+        labels = {"provider": provider}
+        yield "llm_latency_sum_seconds", labels, stats["latency_seconds"]["sum"]
+        yield "llm_requests", labels, stats["latency_seconds"]["count"]
+        yield "llm_circuit_open", labels, 0 if stats["circuit"] == "closed" else 1
+        for status, errors in stats["errors"].items():
+            yield "llm_errors", {**labels, "status": status}, errors
+
+
+stats_collector("embedding_cache", cache_stats)
+stats_collector("embedding_backend", backend_stats)
+stats_collector("robots_cache", ROBOTS.stats)
+register_collector(_provider_samples)
+
+
+@app.before_request
+def start_request_trace():
+    g.trace = begin_trace()
+
+
+@app.teardown_request
+def finish_request_trace(exc):
+    trace = g.pop("trace", None)
+    end_trace(trace, f"{request.method} {request.path}", endpoint=request.endpoint or "unknown")
+
+
+def _text_stream(chunks):
+    return Response(stream_with_context(chunks), mimetype="text/plain", headers={"X-Accel-Buffering": "no"})
+
+
+def _llm_text_stream(start: Callable[[], Iterator[str]]):
+    # Failures before the first chunk still get an error status; later ones can only be reported inline.
+    try:
+        chunks = start()
+        first = next(chunks, "")
+    except ValueError as exc:
+        return Response(str(exc), status=400, mimetype="text/plain")
+    except Exception as exc:
+        logger.warning("LLM stream failed before the first chunk: %s", type(exc).__name__)
+        return Response(LLM_ERROR_MESSAGE.format(type(exc).__name__), status=502, mimetype="text/plain")
+
+    def guarded():
+        yield first
+        try:
+            yield from chunks
+        except Exception as exc:
+            logger.warning("LLM stream failed mid-response: %s", type(exc).__name__)
+            yield "\n\n" + LLM_ERROR_MESSAGE.format(type(exc).__name__)
+
+    return _text_stream(guarded())
+
+
+@app.errorhandler(413)
+def upload_too_large(exc):
+    flash(str(PDFTooLarge(request.content_length or 0)))
+    return redirect(url_for("upload"))
 
 
 @app.route("/")
@@ -59,24 +127,32 @@ def upload():
             if resume.filename:
                 path = os.path.join(UPLOAD_FOLDER, resume.filename)
                 resume.save(path)
-                text = extract_text_from_pdf(path)
+                try:
+                    text = extract_text_from_pdf(path)
+                except PDFTooLarge as exc:
+                    os.remove(path)
+                    flash(str(exc))
+                    return redirect(url_for("upload"))
         website = request.form.get("website")
         if website:
             text += f"\nWebsite: {website}"
 
         profile = build_interest_profile(text, interests)
+        session_id = save_session(profile, countries, provider, model)
         if provider and api_key:
-            questions = ask_clarifying_questions(provider, model, api_key, text)
-            refined = refine_interest_vector(provider, model, api_key, profile)
+            with open(_background_path(session_id), "w", encoding="utf-8") as handle:
+                handle.write(text[:4000])
+            questions = None
         else:
-            questions = "Provide any additional research interests or methods you'd like to emphasize."
-            refined = profile["topics"]
+            questions = DEFAULT_QUESTIONS
+        refined = profile["topics"]
 
-        session_id = save_session(profile, countries, provider, model)
         session["session_id"] = session_id
         session["profile"] = profile
         session["refined"] = refined
-        return render_template("llm_config.html", questions=questions, refined=refined)
+        return render_template(
+            "llm_config.html", questions=questions, refined=refined, refine=bool(provider and api_key)
+        )
     return render_template("upload.html")
 
 
@@ -90,57 +166,126 @@ def results():
     if not refined:
         refined = profile.get("topics", [])
 
-    query = " ".join(refined)
-    papers = search_arxiv(query, max_results=15) + search_semantic_scholar(query, limit=15)
-    researchers = build_researcher_profiles(papers)
-    for researcher in researchers:
-        enrichment = enrich_researcher(researcher["name"], researcher.get("institution", ""))
-        researcher.update(enrichment)
-        researcher["research_areas"] = refined[:5]
-        researcher["top_papers"] = [p.get("title") for p in researcher.get("papers", [])[:3]]
-        researcher["country"] = researcher.get("country", "")
-        researcher["institution"] = researcher.get("institution", "")
-    ranked = rank_researchers(researchers, refined, countries)
-    save_results(session_id, ranked)
-    graph_path = generate_graph(ranked[:10]) if ranked else ""
-    return render_template("results.html", researchers=ranked, graph_path=graph_path)
+    update_session_search(session_id, refined, countries)
+    job_id = submit_search(session_id, refined, countries)
+    return redirect(url_for("job_page", job_id=job_id))
+
+
+@app.route("/results/<int:job_id>")
+def job_results(job_id):
+    job = get_job(job_id)
+    if job is None or job["status"] != "done":
+        return redirect(url_for("job_page", job_id=job_id))
+    session_id = session.get("session_id")
+    page = max(request.args.get("page", 1, type=int), 1)
+    offset = (page - 1) * RESULTS_PAGE_SIZE
+    researchers = get_results(session_id, offset=offset, limit=RESULTS_PAGE_SIZE, with_papers=False)
+    return render_template(
+        "results.html",
+        researchers=researchers,
+        graph_id=job["progress"].get("graph_id", ""),
+        job_id=job_id,
+        hybrid=HYBRID_RANKING,
+        page=page,
+        offset=offset,
+        has_next=offset + RESULTS_PAGE_SIZE < count_results(session_id),
+    )
+
+
+@app.route("/jobs/<int:job_id>")
+def job_page(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return redirect(url_for("home"))
+    return render_template("job.html", job=job)
+
+
+@app.route("/jobs/<int:job_id>/status")
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    return _job_payload(job)
+
+
+@app.route("/jobs/<int:job_id>/events")
+def job_events(job_id):
+    def events():
+        last = None
+        while True:
+            job = get_job(job_id)
+            if job is None:
+                return
+            payload = json.dumps(_job_payload(job))
+            if payload != last:
+                yield f"data: {payload}\n\n"
+                last = payload
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            time.sleep(JOB_EVENT_INTERVAL_SECONDS)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers={"X-Accel-Buffering": "no"})
+
+
+@app.route("/jobs/<int:job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    if cancel(job_id, session.get("session_id")):
+        flash("Search cancelled.")
+    return redirect(url_for("home"))
+
+
+def _job_payload(job):
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "results_url": url_for("job_results", job_id=job["id"]),
+    }
 
 
 @app.route("/professor/<int:index>")
 def professor(index):
     session_id = session.get("session_id")
-    results = get_results(session_id)
-    if index < 0 or index >= len(results):
+    professor = get_result(session_id, index)
+    if professor is None:
         return redirect(url_for("home"))
-    professor = results[index]
     return render_template("profile.html", professor=professor, index=index)
 
 
+def _export(chunks, mimetype: str, filename: str):
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 @app.route("/export/csv")
 def export_csv():
-    session_id = session.get("session_id")
-    results = get_results(session_id)
-    df = pd.DataFrame(results)
-    path = "researchers.csv"
-    df.to_csv(path, index=False)
-    return send_file(path, as_attachment=True)
+    return _export(stream_csv(iter_results(session.get("session_id"))), "text/csv", "researchers.csv")
 
 
 @app.route("/export/pdf")
 def export_pdf():
-    session_id = session.get("session_id")
-    results = get_results(session_id)
-    path = "researchers.pdf"
-    c = canvas.Canvas(path, pagesize=letter)
-    y = 750
-    for researcher in results:
-        c.drawString(50, y, f"{researcher['name']} - {researcher.get('institution', '')}")
-        y -= 20
-        if y < 100:
-            c.showPage()
-            y = 750
-    c.save()
-    return send_file(path, as_attachment=True)
+    return _export(stream_pdf(iter_results(session.get("session_id"))), "application/pdf", "researchers.pdf")
+
+
+@app.route("/export/ndjson")
+def export_ndjson():
+    results = iter_results(session.get("session_id"), with_papers=True)
+    return _export(stream_ndjson(results), "application/x-ndjson", "researchers.ndjson")
+
+
+@app.route("/export/parquet")
+def export_parquet():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return {"error": "Parquet export requires pyarrow"}, 501
+    results = iter_results(session.get("session_id"))
+    return _export(stream_parquet(results), "application/vnd.apache.parquet", "researchers.parquet")
 
 
 @app.route("/alerts")
@@ -160,12 +305,52 @@ def generate_email():
         "Draft a concise, professional cold email to a professor about research fit. "
         f"Professor: {professor}. Student interests: {', '.join(profile.get('topics', []))}."
     )
-    if provider and api_key:
-        from llm_router import call_llm
-        email = call_llm(provider, model, api_key, prompt)
-    else:
-        email = "Please configure an LLM provider to generate a custom email."
-    return {"email": email}
+    if not (provider and api_key):
+        return _text_stream(iter(["Please configure an LLM provider to generate a custom email."]))
+    return _llm_text_stream(lambda: call_llm_stream(provider, model, api_key, prompt))
+
+
+@app.route("/clarifying-questions")
+def clarifying_questions():
+    provider = session.get("provider")
+    api_key = session.get("api_key")
+    path = _background_path(session.get("session_id"))
+    if not (provider and api_key) or not os.path.exists(path):
+        return _text_stream(iter([DEFAULT_QUESTIONS]))
+    with open(path, encoding="utf-8") as handle:
+        text = handle.read()
+    return _llm_text_stream(lambda: stream_clarifying_questions(provider, session.get("model"), api_key, text))
+
+
+@app.route("/refined-topics")
+def refined_topics():
+    provider = session.get("provider")
+    api_key = session.get("api_key")
+    profile = session.get("profile")
+    if not (provider and api_key and profile):
+        return {"refined": session.get("refined", [])}
+    try:
+        refined = refine_interest_vector(provider, session.get("model"), api_key, profile)
+    except Exception as exc:
+        logger.warning("interest refinement failed: %s", type(exc).__name__)
+        return {"refined": [], "error": LLM_ERROR_MESSAGE.format(type(exc).__name__)}, 502
+    session["refined"] = refined
+    return {"refined": refined}
+
+
+@app.route("/cache/stats")
+def embedding_cache_stats():
+    return {"embeddings": cache_stats()}
+
+
+@app.route("/llm/stats")
+def llm_stats():
+    return {"providers": provider_stats()}
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 
 @app.context_processor
@@ -174,13 +359,13 @@ def inject_globals():
 
 
 def schedule_weekly_alerts():
-    sessions = list_sessions()
-    for s in sessions:
-        save_alert(s["id"], "Weekly check completed - review new matches.")
+    run_alerts()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     init_db()
+    resume_jobs()
     scheduler = BackgroundScheduler()
     scheduler.add_job(schedule_weekly_alerts, "interval", days=7, next_run_time=datetime.utcnow())
     scheduler.start()
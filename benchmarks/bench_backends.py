@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from common import WORDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="bench-backends-")
+
+WORKER = """
+import json, resource, sys, time
+import numpy as np
+import nlp
+texts = json.load(open(sys.argv[1]))
+backend = nlp.get_backend()
+backend.encode(texts[:8])
+start = time.perf_counter()
+vectors = nlp.encode_texts(texts)
+elapsed = time.perf_counter() - start
+np.save(sys.argv[2], vectors)
+print(json.dumps({
+    "model_id": backend.model_id,
+    "seconds": elapsed,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def corpus(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(8, 300))) for _ in range(size)]
+
+
+def run_backend(name: str, corpus_path: str):
+    vectors_path = os.path.join(WORKDIR, f"{name}.npy")
+    env = {**os.environ, "PYTHONPATH": ROOT, "EMBEDDING_BACKEND": name}
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER, corpus_path, vectors_path],
+        cwd=WORKDIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), np.load(vectors_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput, memory and agreement of embedding backends")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--size", type=int, default=1000)
+    args = parser.parse_args()
+
+    texts = corpus(args.size)
+    corpus_path = os.path.join(WORKDIR, "corpus.json")
+    with open(corpus_path, "w") as handle:
+        json.dump(texts, handle)
+
+    reference = None
+    for name in args.backends:
+        stats, vectors = run_backend(name, corpus_path)
+        report = {
+            "backend": name,
+            "texts": len(texts),
+            "texts_per_second": round(len(texts) / stats["seconds"], 1),
+            "peak_rss_mb": round(stats["peak_rss_mb"], 1),
+        }
+        if reference is None:
+            reference = vectors
+        else:
+            agreement = np.sum(reference * vectors, axis=1)
+            report["cosine_vs_" + args.backends[0]] = {
+                "mean": round(float(agreement.mean()), 4),
+                "min": round(float(agreement.min()), 4),
+            }
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
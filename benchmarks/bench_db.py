@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+def legacy_conn():
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def legacy_list_sessions():
+    conn = legacy_conn()
+    rows = [dict(row) for row in conn.execute("SELECT * FROM sessions ORDER BY created_at DESC LIMIT 20")]
+    conn.close()
+    return rows
+
+
+def legacy_save_alert(session_id: int, message: str):
+    conn = legacy_conn()
+    conn.execute(
+        "INSERT INTO alerts (session_id, created_at, message) VALUES (?, ?, ?)",
+        (session_id, "now", message),
+    )
+    conn.commit()
+    conn.close()
+
+
+def pooled_list_sessions():
+    conn = db.get_conn()
+    return [dict(row) for row in conn.execute("SELECT * FROM sessions ORDER BY created_at DESC LIMIT 20")]
+
+
+def run(mode: str, threads: int, operations: int, write_ratio: float):
+    read = legacy_list_sessions if mode == "legacy" else pooled_list_sessions
+    write = legacy_save_alert if mode == "legacy" else db.save_alert
+    errors = []
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        local = []
+        for _ in range(operations):
+            start = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    write(rng.randint(1, 100), "benchmark alert")
+                else:
+                    read()
+            except sqlite3.OperationalError as exc:
+                errors.append(str(exc))
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "mode": mode,
+        "threads": threads,
+        "ops_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+        "lock_errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed read/write throughput of the SQLite data layer")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--operations", type=int, default=500)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("legacy", "pooled"):
+            db.DB_PATH = Path(tmp) / f"{mode}.db"
+            db.init_db()
+            for i in range(200):
+                db.save_session({"topics": [f"topic {i}"]}, ["Germany"], "openai", "gpt-4o-mini")
+            if mode == "legacy":
+                db.close_conn()
+                conn = sqlite3.connect(db.DB_PATH)
+                conn.execute("PRAGMA journal_mode=DELETE")
+                conn.close()
+            for threads in args.threads:
+                print(json.dumps(run(mode, threads, args.operations, args.write_ratio)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+import argparse
+import copy
+import hashlib
+import json
+import os
+import random
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from common import HASH_BACKEND, WORDS, register_hash_backend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV_NS = "{http://arxiv.org/schemas/atom}"
+FIRST_NAMES = ["Wei", "Maria", "John", "Anna", "Ahmed", "Sara", "Peter", "Li", "Ivan", "Kim", "Elena", "Ravi"]
+LAST_NAMES = ["Zhang", "Garcia", "Smith", "Novak", "Khan", "Lee", "Wang", "Petrov", "Rossi", "Patel", "Muller"]
+
+for prefix, namespace in (("", ATOM[1:-1]), ("arxiv", ARXIV_NS[1:-1]),
+                          ("opensearch", "http://a9.com/-/spec/opensearch/1.1/")):
+    ET.register_namespace(prefix, namespace)
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as handle:
+        return handle.read()
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+class Workload:
+    """Expands the recorded fixtures into deterministic result sets of any size."""
+
+    def __init__(self, papers: int):
+        self.papers = papers
+        self.arxiv = ET.fromstring(load_fixture("arxiv.xml"))
+        self.arxiv_entries = self.arxiv.findall(f"{ATOM}entry")
+        for entry in self.arxiv_entries:
+            self.arxiv.remove(entry)
+        self.s2 = json.loads(load_fixture("semantic_scholar.json"))
+        self.ddg = load_fixture("duckduckgo.json")
+        self.homepage = load_fixture("homepage.html")
+
+    def _rng(self, source: str, query: str) -> random.Random:
+        return random.Random(hashlib.sha256(f"{source}|{query}".encode()).hexdigest())
+
+    def _author(self, rng: random.Random) -> tuple:
+        person = rng.randrange(max(8, int(self.papers * 0.6)))
+        first = FIRST_NAMES[person % len(FIRST_NAMES)]
+        last = f"{LAST_NAMES[person // len(FIRST_NAMES) % len(LAST_NAMES)]}{person // 132 or ''}"
+        name = f"{first[0]}. {last}" if rng.random() < 0.1 else f"{first} {last}"
+        return name, str(2200000 + person)
+
+    def _title(self, rng: random.Random, template: str) -> str:
+        return f"{' '.join(rng.choices(WORDS, k=6)).title()} - {template.split()[0]}"
+
+    def arxiv_feed(self, query: str, start: int, limit: int) -> bytes:
+        rng = self._rng(f"arxiv|{start}", query)
+        feed = copy.deepcopy(self.arxiv)
+        feed.find("{http://a9.com/-/spec/opensearch/1.1/}totalResults").text = str(self.papers)
+        for i in range(start, min(start + limit, self.papers)):
+            entry = copy.deepcopy(self.arxiv_entries[i % len(self.arxiv_entries)])
+            entry.find(f"{ATOM}id").text = f"http://arxiv.org/abs/2405.{rng.randrange(10 ** 5):05d}v1"
+            entry.find(f"{ATOM}title").text = self._title(rng, entry.find(f"{ATOM}title").text)
+            for author in entry.findall(f"{ATOM}author"):
+                author.find(f"{ATOM}name").text = self._author(rng)[0]
+            doi = entry.find(f"{ARXIV_NS}doi")
+            if doi is not None:
+                doi.text = f"10.1000/bench.{rng.randrange(10 ** 9)}"
+            feed.append(entry)
+        return ET.tostring(feed, encoding="utf-8", xml_declaration=True)
+
+    def s2_page(self, query: str, limit: int) -> bytes:
+        rng = self._rng("s2", query)
+        templates = self.s2["data"]
+        data = []
+        for i in range(min(limit, self.papers)):
+            paper = copy.deepcopy(templates[i % len(templates)])
+            paper["title"] = self._title(rng, paper["title"])
+            if (paper.get("externalIds") or {}).get("DOI"):
+                paper["externalIds"]["DOI"] = f"10.1000/bench.{rng.randrange(10 ** 9)}"
+            authors = []
+            for _ in paper["authors"]:
+                name, author_id = self._author(rng)
+                authors.append({"authorId": author_id if rng.random() < 0.8 else None, "name": name})
+            paper["authors"] = authors
+            data.append(paper)
+        return json.dumps({**self.s2, "data": data, "next": len(data)}).encode("utf-8")
+
+    def search_results(self, base: str, query: str, max_results: int):
+        name = query.split(" university homepage")[0].strip()
+        payload = self.ddg.replace("{base}", base).replace("{name}", name).replace("{slug}", slugify(name))
+        return json.loads(payload)[:max_results]
+
+    def person_page(self, slug: str) -> bytes:
+        name = slug.replace("-", " ").title()
+        return self.homepage.replace("{name}", name).replace("{slug}", slug).encode("utf-8")
+
+
+class StubServer:
+    def __init__(self, workload: Workload):
+        self.workload = workload
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/arxiv":
+                    body, kind = stub.workload.arxiv_feed(
+                        params.get("search_query", ""), int(params.get("start", 0)),
+                        int(params.get("max_results", 10)),
+                    ), "application/atom+xml"
+                elif url.path == "/s2":
+                    body, kind = stub.workload.s2_page(params.get("query", ""), int(params.get("limit", 10))), \
+                        "application/json"
+                elif url.path == "/robots.txt":
+                    body, kind = b"User-agent: *\nAllow: /\n", "text/plain"
+                elif url.path.startswith("/people/"):
+                    body, kind = stub.workload.person_page(url.path.rsplit("/", 1)[-1]), "text/html"
+                else:
+                    self.send_error(404)
+                    return
+                with stub._lock:
+                    stub.requests += 1
+                    stub.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+def bench_search_client(stub: StubServer):
+    class StubDDGS:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def text(self, query, max_results=5):
+            return stub.workload.search_results(stub.base, query, max_results)
+
+    return StubDDGS
+
+
+def configure(base: str, args):
+    """Points the app at the stub server; must run before the app modules are imported."""
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    os.chdir(workdir)
+    os.environ.update({
+        "ARXIV_URL": f"{base}/arxiv",
+        "SEMANTIC_SCHOLAR_URL": f"{base}/s2",
+        "SCRAPER_RATE_LIMIT_SECONDS": "0",
+        "ARXIV_PAGE_DELAY_SECONDS": "0",
+        "JOB_WORKERS": str(args.clients),
+        "METRICS_ENABLED": "1",
+    })
+    if not args.real_model:
+        os.environ["EMBEDDING_BACKEND"] = HASH_BACKEND
+    sys.path.insert(0, ROOT)
+    return workdir
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def summarize(latencies):
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def stage_profile(papers: int):
+    """Runs the search pipeline once in-process and records time and peak allocation per stage."""
+    import db
+    import pipeline
+
+    pipeline.DISCOVER_LIMIT = max(1, papers // 2)
+    stages = {}
+    state = {"stage": None, "start": 0.0}
+
+    def close_stage():
+        if state["stage"] is not None:
+            _, peak = tracemalloc.get_traced_memory()
+            stages[state["stage"]] = {
+                "seconds": round(time.perf_counter() - state["start"], 4),
+                "peak_alloc_mb": round(peak / 2 ** 20, 2),
+            }
+        tracemalloc.reset_peak()
+        state["start"] = time.perf_counter()
+
+    def progress(stage, **counts):
+        close_stage()
+        state["stage"] = stage
+
+    tracemalloc.start()
+    try:
+        result = pipeline.run_search([f"profile workload {papers}"], [], progress=progress)
+        close_stage()
+        state["stage"] = "persisting"
+        session_id = db.save_session({"topics": [], "skills": [], "methods": []}, [], None, None)
+        db.save_results(session_id, result["researchers"])
+        close_stage()
+    finally:
+        tracemalloc.stop()
+    return {"researchers": len(result["researchers"]), "stages": stages}
+
+
+def client_flow(app, client_id: int, iteration: int, poll_interval: float):
+    client = app.test_client()
+    topic = f"{WORDS[(client_id + iteration) % len(WORDS)]} client{client_id} run{iteration}"
+    timings = {}
+    start = time.perf_counter()
+    response = client.post("/upload", data={"interests": topic})
+    timings["upload"] = time.perf_counter() - start
+    assert response.status_code == 200, response.status_code
+
+    mark = time.perf_counter()
+    response = client.post("/results", data={"refined": topic})
+    timings["submit"] = time.perf_counter() - mark
+    job_id = int(response.headers["Location"].rstrip("/").rsplit("/", 1)[-1])
+
+    mark = time.perf_counter()
+    while True:
+        status = client.get(f"/jobs/{job_id}/status").get_json()
+        if status["status"] in ("done", "failed", "cancelled"):
+            break
+        time.sleep(poll_interval)
+    timings["job"] = time.perf_counter() - mark
+    if status["status"] != "done":
+        raise RuntimeError(f"job {job_id} ended as {status['status']}: {status.get('error')}")
+
+    mark = time.perf_counter()
+    response = client.get(f"/results/{job_id}")
+    timings["results_page"] = time.perf_counter() - mark
+    assert response.status_code == 200, response.status_code
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def load_test(papers: int, clients: int, iterations: int, poll_interval: float):
+    import app as web
+    import pipeline
+
+    pipeline.DISCOVER_LIMIT = max(1, papers // 2)
+    samples, errors = [], []
+    lock = threading.Lock()
+
+    def worker(client_id):
+        for iteration in range(iterations):
+            try:
+                timings = client_flow(web.app, client_id, iteration, poll_interval)
+            except Exception as exc:
+                with lock:
+                    errors.append(str(exc))
+                continue
+            with lock:
+                samples.append(timings)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    phases = ("upload", "submit", "job", "results_page", "total")
+    return {
+        "clients": clients,
+        "searches": len(samples),
+        "errors": errors[:5],
+        "searches_per_second": round(len(samples) / elapsed, 3),
+        "latency": {phase: summarize([s[phase] for s in samples]) for phase in phases},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark against recorded fixtures")
+    parser.add_argument("--papers", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--real-model", action="store_true", help="embed with the configured model")
+    parser.add_argument("--output", help="write the JSON report to this path")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    stub = StubServer(Workload(max(args.papers)))
+    workdir = configure(stub.base, args)
+    if not args.real_model:
+        register_hash_backend()
+    import db
+    import scraper
+
+    scraper.set_search_client(bench_search_client(stub))
+    db.init_db()
+
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "embedding_backend": os.environ.get("EMBEDDING_BACKEND", "torch"),
+        "workdir": workdir,
+        "runs": [],
+    }
+    for papers in args.papers:
+        stub.workload.papers = papers
+        requests_before, bytes_before = stub.requests, stub.bytes_sent
+        run = {"papers": papers, "stage_profile": stage_profile(papers)}
+        run["load"] = load_test(papers, args.clients, args.iterations, args.poll_interval)
+        run["stub_requests"] = stub.requests - requests_before
+        run["stub_bytes"] = stub.bytes_sent - bytes_before
+        run["peak_rss_mb"] = peak_rss_mb()
+        report["runs"].append(run)
+        print(json.dumps({"papers": papers, "total": run["load"]["latency"]["total"]}), file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as handle:
+            handle.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
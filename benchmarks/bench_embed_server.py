@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import HASH_BACKEND, WORDS
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+WORKDIR = tempfile.mkdtemp(prefix="bench-embed-server-")
+
+HASH_PREAMBLE = """
+import common
+common.register_hash_backend()
+"""
+
+WORKER = """
+import json, resource, sys, threading, time
+import nlp
+texts = json.load(open(sys.argv[1]))
+threads, request_size = int(sys.argv[2]), int(sys.argv[3])
+backend = nlp.get_backend()
+load_start = time.perf_counter()
+backend.encode(texts[:1])
+load_seconds = time.perf_counter() - load_start
+requests = [texts[i:i + request_size] for i in range(0, len(texts), request_size)]
+latencies = []
+
+def run(part):
+    for batch in part:
+        start = time.perf_counter()
+        nlp.encode_texts(batch)
+        latencies.append(time.perf_counter() - start)
+
+start = time.time()
+pool = [threading.Thread(target=run, args=(requests[i::threads],)) for i in range(threads)]
+for thread in pool:
+    thread.start()
+for thread in pool:
+    thread.join()
+latencies.sort()
+print(json.dumps({
+    "start": start,
+    "end": time.time(),
+    "texts": len(texts),
+    "load_seconds": load_seconds,
+    "p50_ms": latencies[len(latencies) // 2] * 1000,
+    "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "backend_stats": backend.stats(),
+}))
+"""
+
+SERVER = """
+import sys
+import embedding_server
+sys.argv = ["embedding_server", "--address", sys.argv[1], "--backend", sys.argv[2]]
+embedding_server.main()
+"""
+
+
+def corpus(size: int, seed: int):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(8, 120))) for _ in range(size)]
+
+
+def peak_rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def wait_for_server(address: str, process, timeout: float = 300.0) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError("embedding server exited during startup")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(address)
+            return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError("embedding server did not start")
+
+
+def run_workers(args, env, preamble: str):
+    processes = []
+    for worker in range(args.workers):
+        path = os.path.join(WORKDIR, f"corpus-{worker}.json")
+        with open(path, "w") as handle:
+            json.dump(corpus(args.texts, seed=worker), handle)
+        processes.append(subprocess.Popen(
+            [sys.executable, "-c", preamble + WORKER, path, str(args.threads), str(args.request_size)],
+            cwd=WORKDIR, env=env, stdout=subprocess.PIPE, text=True,
+        ))
+    results = []
+    for process in processes:
+        stdout, _ = process.communicate()
+        if process.returncode:
+            raise RuntimeError("benchmark worker failed")
+        results.append(json.loads(stdout.strip().splitlines()[-1]))
+    return results
+
+
+def summarize(mode: str, results, server_rss: float = 0.0, server_start: float = 0.0):
+    elapsed = max(r["end"] for r in results) - min(r["start"] for r in results)
+    worker_rss = sum(r["peak_rss_mb"] for r in results)
+    return {
+        "mode": mode,
+        "workers": len(results),
+        "texts_per_second": round(sum(r["texts"] for r in results) / elapsed, 1),
+        "p50_ms": round(max(r["p50_ms"] for r in results), 2),
+        "p95_ms": round(max(r["p95_ms"] for r in results), 2),
+        "worker_load_seconds": round(max(r["load_seconds"] for r in results), 3),
+        "server_start_seconds": round(server_start, 3),
+        "total_rss_mb": round(worker_rss + server_rss, 1),
+        "server_rss_mb": round(server_rss, 1),
+        "fallback_texts": sum(r["backend_stats"].get("fallback_texts", 0) for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker models vs a shared embedding server")
+    parser.add_argument("--backend", default="torch", help="embedding backend, or bench-hash for a model-free run")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="concurrent requests per worker")
+    parser.add_argument("--texts", type=int, default=400, help="texts encoded by each worker")
+    parser.add_argument("--request-size", type=int, default=4, help="texts per encode call")
+    args = parser.parse_args()
+
+    preamble = HASH_PREAMBLE if args.backend == HASH_BACKEND else ""
+    base_env = {**os.environ, "PYTHONPATH": os.pathsep.join([ROOT, BENCHMARKS]), "METRICS_ENABLED": "0"}
+
+    local = run_workers(args, {**base_env, "EMBEDDING_BACKEND": args.backend}, preamble)
+    print(json.dumps(summarize("per-worker", local)))
+
+    address = os.path.join(WORKDIR, "embedding_server.sock")
+    server = subprocess.Popen(
+        [sys.executable, "-c", preamble + SERVER, address, args.backend],
+        cwd=WORKDIR, env=base_env, stderr=subprocess.DEVNULL,
+    )
+    try:
+        started = wait_for_server(address, server)
+        remote_env = {
+            **base_env, "EMBEDDING_BACKEND": "remote", "EMBEDDING_SERVER_ADDRESS": address,
+            "EMBEDDING_SERVER_BACKEND": args.backend,
+        }
+        shared = run_workers(args, remote_env, preamble)
+        print(json.dumps(summarize("shared-server", shared, peak_rss_mb(server.pid), started)))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
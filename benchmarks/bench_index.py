@@ -0,0 +1,66 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from researcher_index import ResearcherIndex, _normalize  # noqa: E402
+
+
+def clustered_vectors(count: int, centers: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    dim = centers.shape[1]
+    labels = rng.integers(len(centers), size=count)
+    return _normalize(centers[labels] + rng.normal(scale=0.25, size=(count, dim)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k and latency of ResearcherIndex vs brute force")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(200, args.dim))
+    vectors = clustered_vectors(args.size, centers, rng)
+    queries = clustered_vectors(args.queries, centers, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ResearcherIndex(path=tmp)
+        start = time.perf_counter()
+        profiles = [{"name": f"Researcher {i}"} for i in range(args.size)]
+        for offset in range(0, args.size, 1000):
+            index.upsert_many(profiles[offset:offset + 1000], vectors[offset:offset + 1000])
+        print(f"built {args.size} x {args.dim} index in {time.perf_counter() - start:.2f}s")
+
+        truth, brute_ms = [], []
+        for query in queries:
+            start = time.perf_counter()
+            scores = vectors @ query
+            top = np.argpartition(-scores, args.k - 1)[:args.k]
+            brute_ms.append((time.perf_counter() - start) * 1000)
+            truth.append(set(top.tolist()))
+        print(f"{'method':>12} {'recall@k':>9} {'p50_ms':>8} {'p95_ms':>8}")
+        print(f"{'brute':>12} {1.0:>9.3f} {statistics.median(brute_ms):>8.3f} "
+              f"{np.percentile(brute_ms, 95):>8.3f}")
+
+        for probe in args.probes:
+            recalls, latencies = [], []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                hits = index.search_rows(query, k=args.k, n_probe=probe)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(len(expected & {row for row, _ in hits}) / args.k)
+            print(f"{'ivf/' + str(probe):>12} {statistics.mean(recalls):>9.3f} "
+                  f"{statistics.median(latencies):>8.3f} {np.percentile(latencies, 95):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
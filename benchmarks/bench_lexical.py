@@ -0,0 +1,98 @@
+import argparse
+import copy
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import WORDS, register_hash_backend  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ranking_labeled.json")
+
+
+def noise_researchers(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    researchers = []
+    for i in range(count):
+        papers = [
+            {"title": " ".join(rng.choices(WORDS, k=8)).title(), "summary": " ".join(rng.choices(WORDS, k=30))}
+            for _ in range(rng.randint(1, 4))
+        ]
+        researchers.append({"name": f"Noise Researcher {i}", "papers": papers, "topics": [p["title"] for p in papers]})
+    return researchers
+
+
+def ndcg_at(ranked, relevant, k):
+    gains = sum(1 / math.log2(i + 2) for i, r in enumerate(ranked[:k]) if r in relevant)
+    ideal = sum(1 / math.log2(i + 2) for i in range(min(k, len(relevant))))
+    return gains / ideal if ideal else 0.0
+
+
+def reciprocal_rank(ranked, relevant):
+    return next((1 / (i + 1) for i, r in enumerate(ranked) if r in relevant), 0.0)
+
+
+def use_hash_backend():
+    import nlp
+
+    nlp.set_backend(register_hash_backend()())
+
+
+def evaluate(mode: str, fixture, noise, k: int):
+    from lexical import BM25Index
+    from matcher import rank_researchers
+
+    researchers = fixture["researchers"] + noise
+    index = BM25Index()
+    start = time.perf_counter()
+    index.add_papers(p for r in researchers for p in r["papers"])
+    ingest = time.perf_counter() - start
+    ndcgs, mrrs, latencies = [], [], []
+    for case in fixture["queries"]:
+        researchers = copy.deepcopy(fixture["researchers"]) + copy.deepcopy(noise)
+        start = time.perf_counter()
+        if mode == "lexical":
+            scores = index.researcher_scores(researchers, " ".join(case["query"]))
+            ranked = [researchers[i] for i in sorted(range(len(researchers)), key=lambda i: -scores[i])]
+        else:
+            ranked = rank_researchers(researchers, case["query"], [], hybrid=mode == "hybrid", lexical_index=index)
+        latencies.append(time.perf_counter() - start)
+        names = [r["name"] for r in ranked]
+        relevant = set(case["relevant"])
+        ndcgs.append(ndcg_at(names, relevant, k))
+        mrrs.append(reciprocal_rank(names, relevant))
+    return {
+        "mode": mode,
+        "researchers": len(fixture["researchers"]) + len(noise),
+        f"ndcg@{k}": round(statistics.mean(ndcgs), 4),
+        "mrr": round(statistics.mean(mrrs), 4),
+        "median_ms": round(statistics.median(latencies) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "ingest_ms": round(ingest * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ranking quality vs latency: vector, lexical and hybrid")
+    parser.add_argument("--noise", type=int, nargs="+", default=[0, 1000, 10000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--hash-backend", action="store_true", help="use a hashed bag-of-words embedding")
+    args = parser.parse_args()
+
+    if args.hash_backend:
+        use_hash_backend()
+    with open(FIXTURE) as handle:
+        fixture = json.load(handle)
+    for count in args.noise:
+        noise = noise_researchers(count)
+        for mode in ("vector", "lexical", "hybrid"):
+            print(json.dumps(evaluate(mode, fixture, noise, args.k)))
+
+
+if __name__ == "__main__":
+    main()
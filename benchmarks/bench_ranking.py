@@ -0,0 +1,51 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import rank_researchers  # noqa: E402
+from nlp import get_model  # noqa: E402
+from common import WORDS  # noqa: E402
+
+INTERESTS = ["Natural Language Processing", "Graph Neural Networks", "Retrieval"]
+
+
+def synthetic_researchers(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    researchers = []
+    for i in range(count):
+        titles = [" ".join(rng.choices(WORDS, k=8)).title() for _ in range(rng.randint(1, 5))]
+        researchers.append({
+            "name": f"Researcher {i}",
+            "papers": [{"title": t} for t in titles],
+            "topics": titles,
+            "country": rng.choice(["United States", "Germany", ""]),
+        })
+    return researchers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request latency of rank_researchers")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    get_model()
+    print(f"{'researchers':>12} {'median_ms':>10} {'min_ms':>10} {'per_researcher_us':>18}")
+    for size in args.sizes:
+        researchers = synthetic_researchers(size)
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            rank_researchers(researchers, INTERESTS, ["United States"])
+            timings.append((time.perf_counter() - start) * 1000)
+        median = statistics.median(timings)
+        print(f"{size:>12} {median:>10.1f} {min(timings):>10.1f} {median * 1000 / size:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
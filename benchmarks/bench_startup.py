@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="bench-startup-")
+ENV = {**os.environ, "PYTHONPATH": ROOT}
+
+
+def import_time(module: str, top: int):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=WORKDIR, env=ENV, capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - start
+    total, entries = 0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = len(name) - len(name.lstrip())
+        if depth == 1 and name.strip() == module:
+            total = int(cumulative_us)
+        elif depth == 3:
+            entries.append((int(cumulative_us), name.strip()))
+    entries.sort(reverse=True)
+    return wall, total, entries[:top]
+
+
+def first_encode(preload: bool):
+    code = (
+        "import time; t = time.perf_counter(); import nlp; "
+        + ("nlp.warm_up(); " if preload else "")
+        + "boot = time.perf_counter() - t; t = time.perf_counter(); "
+        "nlp.get_backend().encode(['first request']); "
+        "print(boot, time.perf_counter() - t)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=WORKDIR, env=ENV, capture_output=True, text=True, check=True
+    )
+    boot, first = output.stdout.split()
+    return float(boot), float(first)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time-to-first-encode for the web app")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--skip-model", action="store_true")
+    args = parser.parse_args()
+
+    wall, total, entries = import_time(args.module, args.top)
+    report = {
+        "module": args.module,
+        "process_wall_seconds": round(wall, 3),
+        "import_cumulative_ms": round(total / 1000, 1),
+        "slowest_direct_imports_ms": {name: round(us / 1000, 1) for us, name in entries},
+    }
+    if not args.skip_model:
+        for preload in (False, True):
+            boot, first = first_encode(preload)
+            key = "preloaded" if preload else "lazy"
+            report[f"{key}_boot_seconds"] = round(boot, 3)
+            report[f"{key}_first_encode_seconds"] = round(first, 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import hashlib
+
+WORDS = (
+    "graph neural network language model transformer vision reinforcement learning robust "
+    "causal inference optimization federated privacy diffusion retrieval generation bayesian "
+    "kernel sparse attention contrastive representation multimodal speech protein molecular"
+).split()
+HASH_BACKEND = "bench-hash"
+HASH_DIM = 384
+
+
+def register_hash_backend():
+    """Registers a model-free hashed bag-of-words embedding backend under HASH_BACKEND.
+
+    nlp is imported here rather than at module level so callers can set environment overrides first.
+    """
+    import numpy as np
+    import nlp
+
+    class HashBackend(nlp.EmbeddingBackend):
+        name = HASH_BACKEND
+
+        def encode(self, texts, batch_size=nlp.EMBED_BATCH_SIZE):
+            matrix = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+            for row, text in enumerate(texts):
+                for token in text.lower().split():
+                    matrix[row, int(hashlib.md5(token.encode()).hexdigest()[:8], 16) % HASH_DIM] += 1.0
+            return nlp.normalize_rows(matrix)
+
+    nlp.register_backend(HASH_BACKEND, HashBackend)
+    return HashBackend
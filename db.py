@@ -1,17 +1,45 @@
+import hashlib
 import sqlite3
 import json
+import threading
 from pathlib import Path
 from datetime import datetime
+from typing import List, Tuple
+from search import merge_paper, paper_key
+from metrics import traced
 
 DB_PATH = Path("data.db")
+STATEMENT_CACHE_SIZE = 256
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=30000",
+)
+
+_local = threading.local()
 
 
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH:
+        conn = sqlite3.connect(DB_PATH, timeout=30, cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
+        _local.path = DB_PATH
     return conn
 
 
+def close_conn():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
 def init_db():
     conn = get_conn()
     cur = conn.cursor()
@@ -29,13 +57,36 @@ def init_db():
     )
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS results (
+        CREATE TABLE IF NOT EXISTS ranked_results (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER,
+            session_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            name TEXT,
+            score REAL,
             data TEXT
         )
         """
     )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS papers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            paper_key TEXT UNIQUE,
+            title TEXT,
+            data TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS result_papers (
+            result_id INTEGER,
+            paper_id INTEGER,
+            position INTEGER,
+            PRIMARY KEY (result_id, position)
+        )
+        """
+    )
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS alerts (
@@ -46,58 +97,378 @@ def init_db():
         )
         """
     )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            query_key TEXT,
+            status TEXT,
+            stage TEXT,
+            params TEXT,
+            progress TEXT,
+            error TEXT,
+            created_at TEXT,
+            updated_at TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_sessions (
+            job_id INTEGER,
+            session_id INTEGER,
+            PRIMARY KEY (job_id, session_id)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS session_embeddings (
+            session_id INTEGER,
+            model TEXT,
+            topics TEXT,
+            dim INTEGER,
+            interest BLOB,
+            topic_vectors BLOB,
+            created_at TEXT,
+            PRIMARY KEY (session_id, model)
+        )
+        """
+    )
+    _ensure_column(conn, "sessions", "refined", "TEXT")
+    _ensure_column(conn, "sessions", "alert_watermark", "TEXT")
+    _ensure_column(conn, "alerts", "researcher", "TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_alerts_session ON alerts (session_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions (created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_ranked_results_session_rank ON ranked_results (session_id, rank)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_result_papers_paper ON result_papers (paper_id)")
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_query ON jobs (query_key) "
+        "WHERE status IN ('queued', 'running')"
+    )
     conn.commit()
-    conn.close()
+    migrate_result_blobs()
+
+
+def _ensure_column(conn, table: str, column: str, definition: str):
+    columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def migrate_result_blobs():
+    conn = get_conn()
+    legacy = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'results'").fetchone()
+    if legacy is None:
+        return
+    migrated = set()
+    for row in conn.execute("SELECT session_id, data FROM results ORDER BY id").fetchall():
+        if row["session_id"] in migrated:
+            continue
+        migrated.add(row["session_id"])
+        if not count_results(row["session_id"]):
+            save_results(row["session_id"], json.loads(row["data"] or "[]"))
+    with conn:
+        conn.execute("DROP TABLE results")
 
 
 def save_session(interests, countries, provider, model):
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO sessions (created_at, interests, countries, provider, model) VALUES (?, ?, ?, ?, ?)",
-        (datetime.utcnow().isoformat(), json.dumps(interests), json.dumps(countries), provider, model),
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO sessions (created_at, interests, countries, provider, model) VALUES (?, ?, ?, ?, ?)",
+            (datetime.utcnow().isoformat(), json.dumps(interests), json.dumps(countries), provider, model),
+        )
+    return cur.lastrowid
+
+
+def stored_paper_key(paper) -> str:
+    key = paper_key(paper)
+    if key == "title:":
+        digest = hashlib.sha256(json.dumps(paper, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+        key = f"untitled:{digest}"
+    return key
+
+
+def _save_papers(conn, papers) -> List[int]:
+    keys = [stored_paper_key(paper) for paper in papers]
+    merged = {}
+    for key, paper in zip(keys, papers):
+        if key in merged:
+            merge_paper(merged[key], paper)
+        else:
+            merged[key] = {**paper, "authors": list(paper.get("authors", []))}
+    unique = list(merged)
+    ids = {}
+    for start in range(0, len(unique), 500):
+        chunk = unique[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        for row in conn.execute(f"SELECT paper_key, data FROM papers WHERE paper_key IN ({placeholders})", chunk):
+            stored = json.loads(row["data"])
+            merged[row["paper_key"]] = merge_paper(stored, merged[row["paper_key"]])
+    conn.executemany(
+        "INSERT INTO papers (paper_key, title, data) VALUES (?, ?, ?) "
+        "ON CONFLICT(paper_key) DO UPDATE SET title = excluded.title, data = excluded.data",
+        [(key, paper.get("title"), json.dumps(paper)) for key, paper in merged.items()],
     )
-    session_id = cur.lastrowid
-    conn.commit()
-    conn.close()
-    return session_id
+    for start in range(0, len(unique), 500):
+        chunk = unique[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        for row in conn.execute(f"SELECT id, paper_key FROM papers WHERE paper_key IN ({placeholders})", chunk):
+            ids[row["paper_key"]] = row["id"]
+    return [ids[key] for key in keys]
+
+
+def update_session_search(session_id: int, refined: List[str], countries: List[str]):
+    conn = get_conn()
+    with conn:
+        conn.execute(
+            "UPDATE sessions SET refined = ?, countries = ? WHERE id = ?",
+            (json.dumps(refined), json.dumps(countries), session_id),
+        )
+
+
+def update_alert_watermarks(watermarks: List[Tuple[str, int]]):
+    conn = get_conn()
+    with conn:
+        conn.executemany("UPDATE sessions SET alert_watermark = ? WHERE id = ?", watermarks)
+
+
+def save_session_embeddings(session_id: int, model: str, topics: List[str], dim: int,
+                            interest: bytes, topic_vectors: bytes):
+    conn = get_conn()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO session_embeddings "
+            "(session_id, model, topics, dim, interest, topic_vectors, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id, model, json.dumps(topics), dim, interest, topic_vectors, datetime.utcnow().isoformat()),
+        )
+
+
+def get_session_embeddings(session_id: int, model: str):
+    conn = get_conn()
+    row = conn.execute(
+        "SELECT topics, dim, interest, topic_vectors FROM session_embeddings WHERE session_id = ? AND model = ?",
+        (session_id, model),
+    ).fetchone()
+    if row is None:
+        return None
+    return {**dict(row), "topics": json.loads(row["topics"])}
 
 
+@traced("save_results")
 def save_results(session_id: int, results):
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO results (session_id, data) VALUES (?, ?)",
-        (session_id, json.dumps(results)),
+    with conn:
+        _save_results(conn, session_id, results)
+
+
+def _save_results(conn, session_id: int, results):
+    conn.execute(
+        "DELETE FROM result_papers WHERE result_id IN (SELECT id FROM ranked_results WHERE session_id = ?)",
+        (session_id,),
     )
-    conn.commit()
-    conn.close()
+    conn.execute("DELETE FROM ranked_results WHERE session_id = ?", (session_id,))
+    for rank, researcher in enumerate(results):
+        data = {k: v for k, v in researcher.items() if k not in ("name", "match_score", "papers")}
+        cur = conn.execute(
+            "INSERT INTO ranked_results (session_id, rank, name, score, data) VALUES (?, ?, ?, ?, ?)",
+            (session_id, rank, researcher.get("name"), researcher.get("match_score"), json.dumps(data)),
+        )
+        papers = researcher.get("papers", [])
+        if papers:
+            paper_ids = _save_papers(conn, papers)
+            conn.executemany(
+                "INSERT INTO result_papers (result_id, paper_id, position) VALUES (?, ?, ?)",
+                [(cur.lastrowid, paper_id, position) for position, paper_id in enumerate(paper_ids)],
+            )
+
 
+def _result_from_row(conn, row, with_papers: bool):
+    result = {"name": row["name"], **json.loads(row["data"] or "{}"), "match_score": row["score"]}
+    if with_papers:
+        result["papers"] = [
+            json.loads(paper["data"])
+            for paper in conn.execute(
+                "SELECT p.data FROM result_papers rp JOIN papers p ON p.id = rp.paper_id "
+                "WHERE rp.result_id = ? ORDER BY rp.position",
+                (row["id"],),
+            )
+        ]
+    return result
 
-def get_results(session_id: int):
+
+def get_results(session_id: int, offset: int = 0, limit: int = None, with_papers: bool = True):
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT data FROM results WHERE session_id = ?", (session_id,))
-    row = cur.fetchone()
-    conn.close()
-    return json.loads(row["data"]) if row else []
+    rows = conn.execute(
+        "SELECT id, name, score, data FROM ranked_results WHERE session_id = ? ORDER BY rank LIMIT ? OFFSET ?",
+        (session_id, -1 if limit is None else limit, offset),
+    ).fetchall()
+    return [_result_from_row(conn, row, with_papers) for row in rows]
+
+
+def get_result(session_id: int, rank: int):
+    conn = get_conn()
+    row = conn.execute(
+        "SELECT id, name, score, data FROM ranked_results WHERE session_id = ? AND rank = ?", (session_id, rank)
+    ).fetchone()
+    return _result_from_row(conn, row, with_papers=True) if row else None
+
+
+def iter_results(session_id: int, batch_size: int = 200, with_papers: bool = False):
+    conn = get_conn()
+    last_rank = -1
+    while True:
+        rows = conn.execute(
+            "SELECT id, rank, name, score, data FROM ranked_results WHERE session_id = ? AND rank > ? "
+            "ORDER BY rank LIMIT ?",
+            (session_id, last_rank, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield _result_from_row(conn, row, with_papers)
+        last_rank = rows[-1]["rank"]
+
+
+def count_results(session_id: int) -> int:
+    conn = get_conn()
+    return conn.execute("SELECT COUNT(*) FROM ranked_results WHERE session_id = ?", (session_id,)).fetchone()[0]
 
 
 def list_sessions():
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM sessions ORDER BY created_at DESC")
-    rows = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return rows
+    return [dict(row) for row in conn.execute("SELECT * FROM sessions ORDER BY created_at DESC")]
+
 
+def save_alert(session_id: int, message: str, researcher: str = None):
+    save_alerts([(session_id, message, researcher)])
 
-def save_alert(session_id: int, message: str):
+
+def save_alerts(alerts: List[Tuple]):
+    now = datetime.utcnow().isoformat()
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO alerts (session_id, created_at, message) VALUES (?, ?, ?)",
-        (session_id, datetime.utcnow().isoformat(), message),
+    with conn:
+        conn.executemany(
+            "INSERT INTO alerts (session_id, created_at, message, researcher) VALUES (?, ?, ?, ?)",
+            [(alert[0], now, alert[1], alert[2] if len(alert) > 2 else None) for alert in alerts],
+        )
+
+
+def alerted_researchers(session_id: int):
+    conn = get_conn()
+    rows = conn.execute(
+        "SELECT researcher FROM alerts WHERE session_id = ? AND researcher IS NOT NULL", (session_id,)
     )
-    conn.commit()
-    conn.close()
+    return {row["researcher"] for row in rows}
+
+
+def _job_from_row(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"] or "{}")
+    job["progress"] = json.loads(job["progress"] or "{}")
+    return job
+
+
+def create_job(query_key: str, params, session_id: int) -> Tuple[int, bool]:
+    now = datetime.utcnow().isoformat()
+    conn = get_conn()
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO jobs (query_key, status, stage, params, progress, created_at, updated_at) "
+                "VALUES (?, 'queued', 'queued', ?, '{}', ?, ?)",
+                (query_key, json.dumps(params), now, now),
+            )
+            conn.execute("INSERT INTO job_sessions (job_id, session_id) VALUES (?, ?)", (cur.lastrowid, session_id))
+        return cur.lastrowid, True
+    except sqlite3.IntegrityError:
+        pass
+    # Attach under the write lock so the job cannot finish between the lookup and the insert.
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE query_key = ? AND status IN ('queued', 'running')", (query_key,)
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "INSERT OR IGNORE INTO job_sessions (job_id, session_id) VALUES (?, ?)", (row["id"], session_id)
+            )
+    if row is None:
+        return create_job(query_key, params, session_id)
+    return row["id"], False
+
+
+@traced("save_results")
+def finish_job(job_id: int, results, progress) -> bool:
+    conn = get_conn()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'done', stage = 'done', progress = ?, updated_at = ? "
+            "WHERE id = ? AND status != 'cancelled'",
+            (json.dumps(progress), datetime.utcnow().isoformat(), job_id),
+        )
+        if cur.rowcount:
+            for row in conn.execute("SELECT session_id FROM job_sessions WHERE job_id = ?", (job_id,)).fetchall():
+                _save_results(conn, row["session_id"], results)
+    return cur.rowcount > 0
+
+
+def get_job(job_id: int):
+    conn = get_conn()
+    return _job_from_row(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def update_job(job_id: int, status: str = None, stage: str = None, progress=None, error: str = None):
+    fields = {"updated_at": datetime.utcnow().isoformat()}
+    if status is not None:
+        fields["status"] = status
+    if stage is not None:
+        fields["stage"] = stage
+    if progress is not None:
+        fields["progress"] = json.dumps(progress)
+    if error is not None:
+        fields["error"] = error
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = get_conn()
+    with conn:
+        cur = conn.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND status != 'cancelled'", (*fields.values(), job_id)
+        )
+    return cur.rowcount > 0
+
+
+def cancel_job(job_id: int, session_id: int) -> bool:
+    # Only an attached session may cancel; the job itself stops once no other session is waiting on it.
+    conn = get_conn()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute(
+            "DELETE FROM job_sessions WHERE job_id = ? AND session_id = ? "
+            "AND job_id IN (SELECT id FROM jobs WHERE status IN ('queued', 'running'))",
+            (job_id, session_id),
+        )
+        if not cur.rowcount:
+            return False
+        conn.execute(
+            "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? "
+            "AND NOT EXISTS (SELECT 1 FROM job_sessions WHERE job_id = ?)",
+            (datetime.utcnow().isoformat(), job_id, job_id),
+        )
+    return True
+
+
+def list_jobs(statuses: List[str]):
+    placeholders = ",".join("?" * len(statuses))
+    conn = get_conn()
+    rows = conn.execute(f"SELECT * FROM jobs WHERE status IN ({placeholders}) ORDER BY id", statuses)
+    return [_job_from_row(row) for row in rows]
+
+
+def job_session_ids(job_id: int) -> List[int]:
+    conn = get_conn()
+    return [row["session_id"] for row in conn.execute("SELECT session_id FROM job_sessions WHERE job_id = ?", (job_id,))]
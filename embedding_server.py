@@ -0,0 +1,303 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import nlp
+
+EMBEDDING_SERVER_ADDRESS = os.environ.get("EMBEDDING_SERVER_ADDRESS", "embedding_server.sock")
+EMBEDDING_SERVER_MAX_WAIT_MS = float(os.environ.get("EMBEDDING_SERVER_MAX_WAIT_MS", "5"))
+EMBEDDING_SERVER_MAX_BATCH = int(os.environ.get("EMBEDDING_SERVER_MAX_BATCH", "256"))
+EMBEDDING_SERVER_MAX_PENDING = int(os.environ.get("EMBEDDING_SERVER_MAX_PENDING", "4096"))
+EMBEDDING_SERVER_TIMEOUT_SECONDS = float(os.environ.get("EMBEDDING_SERVER_TIMEOUT_SECONDS", "30"))
+EMBEDDING_SERVER_RETRY_SECONDS = 30.0
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+BUSY_BACKOFF_SECONDS = 0.05
+
+logger = logging.getLogger("embedding_server")
+_HEADER = struct.Struct("!II")
+
+
+class ServerBusy(Exception):
+    pass
+
+
+def parse_address(address: str):
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_frame(sock: socket.socket, header: Dict, payload: bytes = b""):
+    head = json.dumps(header).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(head), len(payload)) + head + payload)
+
+
+def recv_frame(sock: socket.socket) -> Tuple[Dict, bytes]:
+    head_size, payload_size = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if head_size + payload_size > MAX_FRAME_BYTES:
+        raise ValueError("frame too large")
+    header = json.loads(_recv_exact(sock, head_size))
+    return header, _recv_exact(sock, payload_size)
+
+
+class MicroBatcher:
+    """Coalesces concurrent encode requests into shared backend batches."""
+
+    def __init__(self, backend: nlp.EmbeddingBackend, max_wait_ms: float = EMBEDDING_SERVER_MAX_WAIT_MS,
+                 max_batch: int = EMBEDDING_SERVER_MAX_BATCH, max_pending: int = EMBEDDING_SERVER_MAX_PENDING):
+        self.backend = backend
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._coalescing = False
+        self.batches = 0
+        self.texts = 0
+        self.rejected = 0
+        threading.Thread(target=self._loop, name="embedding-batcher", daemon=True).start()
+
+    def submit(self, texts: List[str]) -> Future:
+        with self._lock:
+            if self._pending and self._pending + len(texts) > self.max_pending:
+                self.rejected += 1
+                raise ServerBusy()
+            self._pending += len(texts)
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future
+
+    def _collect(self) -> List[Tuple[List[str], Future]]:
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        # Only hold the batch open for stragglers when traffic is actually concurrent.
+        deadline = time.monotonic() + (self.max_wait if self._coalescing else 0)
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        self._coalescing = len(batch) > 1
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            texts = [text for item, _ in batch for text in item]
+            try:
+                vectors = self.backend.encode(texts, batch_size=self.max_batch)
+            except Exception as exc:
+                logger.exception("embedding batch of %d texts failed", len(texts))
+                for _, future in batch:
+                    future.set_exception(exc)
+            else:
+                offset = 0
+                for item, future in batch:
+                    future.set_result(vectors[offset:offset + len(item)])
+                    offset += len(item)
+            with self._lock:
+                self._pending -= len(texts)
+                self.batches += 1
+                self.texts += len(texts)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "batches": self.batches,
+                "texts": self.texts,
+                "rejected": self.rejected,
+                "mean_batch": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            }
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        batcher: MicroBatcher = self.server.batcher
+        while True:
+            try:
+                header, _ = recv_frame(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+            if header.get("op") == "info":
+                send_frame(self.request, {"model_id": batcher.backend.model_id, **batcher.stats()})
+                continue
+            texts = [str(t) for t in header.get("texts", [])]
+            try:
+                vectors = batcher.submit(texts).result(timeout=EMBEDDING_SERVER_TIMEOUT_SECONDS)
+            except ServerBusy:
+                send_frame(self.request, {"error": "busy"})
+                continue
+            except Exception as exc:
+                send_frame(self.request, {"error": str(exc) or type(exc).__name__})
+                continue
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            send_frame(self.request, {"model_id": batcher.backend.model_id, "shape": list(vectors.shape)},
+                       vectors.tobytes())
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+def make_server(address: str = EMBEDDING_SERVER_ADDRESS, backend: str = nlp.EMBEDDING_SERVER_BACKEND):
+    if backend not in nlp.BACKENDS or backend == "remote":
+        raise ValueError(f"Unsupported embedding backend: {backend}")
+    family, target = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(target):
+            os.unlink(target)
+        server = _UnixServer(target, _Handler)
+        os.chmod(target, 0o600)
+    else:
+        server = _TCPServer(target, _Handler)
+    server.batcher = MicroBatcher(nlp.BACKENDS[backend]())
+    return server
+
+
+class RemoteBackend(nlp.EmbeddingBackend):
+    """Client for the shared embedding server; encodes in-process when the server is unavailable."""
+
+    name = "remote"
+
+    def __init__(self, address: str = EMBEDDING_SERVER_ADDRESS, fallback: str = nlp.EMBEDDING_SERVER_BACKEND,
+                 timeout: float = EMBEDDING_SERVER_TIMEOUT_SECONDS):
+        self.address = address
+        self.timeout = timeout
+        self.fallback = nlp.BACKENDS[fallback]()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self.remote_texts = 0
+        self.fallback_texts = 0
+        self.busy = 0
+
+    @property
+    def model_id(self) -> str:
+        return self.fallback.model_id
+
+    def _connect(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            family, target = parse_address(self.address)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(target)
+                send_frame(sock, {"op": "info"})
+                header, _ = recv_frame(sock)
+            except Exception:
+                sock.close()
+                raise
+            if header.get("model_id") != self.model_id:
+                sock.close()
+                raise ValueError(f"embedding server serves {header.get('model_id')}, expected {self.model_id}")
+            self._local.sock = sock
+        return sock
+
+    def _disconnect(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _encode_remote(self, texts: List[str]) -> np.ndarray:
+        return np.concatenate([
+            self._request(texts[start:start + EMBEDDING_SERVER_MAX_BATCH])
+            for start in range(0, len(texts), EMBEDDING_SERVER_MAX_BATCH)
+        ])
+
+    def _request(self, texts: List[str]) -> np.ndarray:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            sock = self._connect()
+            send_frame(sock, {"op": "encode", "texts": texts})
+            header, payload = recv_frame(sock)
+            if header.get("error") != "busy":
+                break
+            with self._lock:
+                self.busy += 1
+            if time.monotonic() + BUSY_BACKOFF_SECONDS > deadline:
+                raise ServerBusy()
+            time.sleep(BUSY_BACKOFF_SECONDS)
+        if "error" in header:
+            raise ValueError(f"embedding server error: {header['error']}")
+        return np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+
+    def encode(self, texts: List[str], batch_size: int = nlp.EMBED_BATCH_SIZE) -> np.ndarray:
+        if texts and time.monotonic() >= self._down_until:
+            try:
+                vectors = self._encode_remote(texts)
+            except ServerBusy:
+                logger.warning("embedding server busy, encoding %d texts locally", len(texts))
+            except (OSError, ValueError) as exc:
+                self._disconnect()
+                self._down_until = time.monotonic() + EMBEDDING_SERVER_RETRY_SECONDS
+                logger.warning("embedding server unavailable (%s), encoding locally", exc)
+            else:
+                with self._lock:
+                    self.remote_texts += len(texts)
+                return vectors
+        with self._lock:
+            self.fallback_texts += len(texts)
+        return self.fallback.encode(texts, batch_size=batch_size)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"remote_texts": self.remote_texts, "fallback_texts": self.fallback_texts, "busy": self.busy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding server for web workers")
+    parser.add_argument("--address", default=EMBEDDING_SERVER_ADDRESS, help="unix socket path or host:port")
+    parser.add_argument("--backend", default=nlp.EMBEDDING_SERVER_BACKEND)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = make_server(args.address, args.backend)
+    server.batcher.backend.encode(["warm up"])
+    logger.info("serving %s embeddings on %s", server.batcher.backend.model_id, args.address)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if parse_address(args.address)[0] == socket.AF_UNIX and os.path.exists(args.address):
+            os.unlink(args.address)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+EXPORT_FIELDS = [
+    "name", "institution", "country", "research_areas", "top_papers",
+    "email", "homepage", "scholar", "linkedin", "match_score",
+]
+PDF_LINES_PER_PAGE = 33
+PARQUET_ROW_GROUP_SIZE = 1000
+
+
+def flatten(researcher: Dict) -> Dict:
+    row = {}
+    for field in EXPORT_FIELDS:
+        value = researcher.get(field, "")
+        row[field] = "; ".join(str(v) for v in value if v) if isinstance(value, list) else value
+    return row
+
+
+def stream_csv(researchers: Iterable[Dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for researcher in researchers:
+        writer.writerow(flatten(researcher))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(researchers: Iterable[Dict]) -> Iterator[str]:
+    for researcher in researchers:
+        yield json.dumps(researcher) + "\n"
+
+
+def _pdf_escape(text: str) -> bytes:
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return escaped.encode("latin-1", errors="replace")
+
+
+def stream_pdf(researchers: Iterable[Dict]) -> Iterator[bytes]:
+    offsets = {}
+    position = 0
+    page_ids = []
+
+    def write_object(number: int, body: bytes) -> bytes:
+        nonlocal position
+        offsets[number] = position
+        chunk = b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        position += len(chunk)
+        return chunk
+
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    position = len(header)
+    yield header
+    yield write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    yield write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    next_id = 4
+    researchers = iter(researchers)
+    while True:
+        page = list(islice(researchers, PDF_LINES_PER_PAGE))
+        if not page and page_ids:
+            break
+        lines = [b"BT /F1 12 Tf 50 750 Td 20 TL"]
+        for researcher in page:
+            line = f"{researcher.get('name', '')} - {researcher.get('institution', '')}"
+            lines.append(b"(" + _pdf_escape(line) + b") Tj T*")
+        lines.append(b"ET")
+        content = b"\n".join(lines)
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        yield write_object(content_id, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        yield write_object(
+            page_id,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id,
+        )
+        page_ids.append(page_id)
+        if len(page) < PDF_LINES_PER_PAGE:
+            break
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    yield write_object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids))
+
+    xref = [b"xref\n0 %d\n" % next_id, b"0000000000 65535 f \n"]
+    for number in range(1, next_id):
+        xref.append(b"%010d 00000 n \n" % offsets[number])
+    xref.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_id, position))
+    yield b"".join(xref)
+
+
+class _ChunkSink:
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_parquet(researchers: Iterable[Dict]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(field, pa.float64() if field == "match_score" else pa.string()) for field in EXPORT_FIELDS])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    researchers = iter(researchers)
+    while True:
+        batch = [flatten(r) for r in islice(researchers, PARQUET_ROW_GROUP_SIZE)]
+        if not batch:
+            break
+        for row in batch:
+            for field in EXPORT_FIELDS:
+                if field == "match_score":
+                    row[field] = None if row[field] in ("", None) else float(row[field])
+                elif row[field] is not None:
+                    row[field] = str(row[field])
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
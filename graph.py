@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List
+
+from metrics import traced
+from search import paper_key
+
+GRAPH_DIR = Path("static") / "graphs"
+GRAPH_MAX_RESEARCHERS = int(os.environ.get("GRAPH_MAX_RESEARCHERS", "2000"))
+GRAPH_MIN_SCORE = float(os.environ.get("GRAPH_MIN_SCORE", "0"))
+GRAPH_MAX_FILES = int(os.environ.get("GRAPH_MAX_FILES", "500"))
+GRAPH_MAX_TOPICS = 200
+TOPICS_PER_RESEARCHER = 3
+MAX_AUTHORS_PER_PAPER = 25
+STOPWORDS = {
+    "about", "across", "after", "analysis", "approach", "based", "between", "from", "into", "learning",
+    "method", "methods", "model", "models", "novel", "over", "study", "such", "their", "through",
+    "toward", "towards", "under", "using", "very", "via", "when", "where", "which", "with", "without",
+}
+
+
+def title_terms(title: str) -> List[str]:
+    terms = re.findall(r"[a-z][a-z\-]{3,}", (title or "").lower())
+    return [t for t in terms if t not in STOPWORDS]
+
+
+def prune(researchers: List[Dict], max_researchers: int = GRAPH_MAX_RESEARCHERS,
+          min_score: float = GRAPH_MIN_SCORE) -> List[Dict]:
+    kept = [r for r in researchers if (r.get("match_score") or 0) >= min_score]
+    kept.sort(key=lambda r: r.get("match_score") or 0, reverse=True)
+    return kept[:max_researchers]
+
+
+def build_graph(researchers: List[Dict], max_researchers: int = GRAPH_MAX_RESEARCHERS,
+                min_score: float = GRAPH_MIN_SCORE) -> Dict[str, List[Dict]]:
+    kept = prune(researchers, max_researchers, min_score)
+    nodes = [
+        {"id": f"r{i}", "label": r["name"], "group": "researcher", "value": r.get("match_score") or 0}
+        for i, r in enumerate(kept)
+    ]
+    edges = []
+
+    authors_by_paper: Dict[str, List[int]] = {}
+    for i, researcher in enumerate(kept):
+        for key in {paper_key(p) for p in researcher.get("papers", [])}:
+            authors_by_paper.setdefault(key, []).append(i)
+    coauthored = Counter()
+    for members in authors_by_paper.values():
+        if 1 < len(members) <= MAX_AUTHORS_PER_PAPER:
+            coauthored.update(combinations(members, 2))
+    edges.extend(
+        {"from": f"r{a}", "to": f"r{b}", "value": count, "kind": "coauthor"}
+        for (a, b), count in sorted(coauthored.items())
+    )
+
+    researcher_terms = [
+        Counter(t for p in r.get("papers", []) for t in set(title_terms(p.get("title", "")))) for r in kept
+    ]
+    spread = Counter(t for terms in researcher_terms for t in terms)
+    topics = {t for t, n in spread.most_common(GRAPH_MAX_TOPICS) if n > 1}
+    linked = set()
+    for i, terms in enumerate(researcher_terms):
+        ranked = sorted((t for t in terms if t in topics), key=lambda t: (-terms[t], -spread[t], t))
+        for term in ranked[:TOPICS_PER_RESEARCHER]:
+            linked.add(term)
+            edges.append({"from": f"r{i}", "to": f"t:{term}", "value": terms[term], "kind": "topic"})
+    nodes.extend({"id": f"t:{t}", "label": t, "group": "topic", "value": spread[t]} for t in sorted(linked))
+    return {"nodes": nodes, "edges": edges}
+
+
+def graph_key(kept: List[Dict]) -> str:
+    # Covers everything build_graph reads from the researchers, so a hit can skip building entirely.
+    inputs = [
+        [r["name"], r.get("match_score") or 0,
+         sorted([paper_key(p), p.get("title") or ""] for p in r.get("papers", []))]
+        for r in kept
+    ]
+    payload = json.dumps(inputs, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:20]
+
+
+def save_graph(graph: Dict, graph_id: str, directory: Path = GRAPH_DIR):
+    path = Path(directory) / f"{graph_id}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(json.dumps(graph, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    os.replace(tmp, path)
+
+
+def prune_graphs(directory: Path = GRAPH_DIR, max_files: int = GRAPH_MAX_FILES):
+    files = []
+    for path in Path(directory).glob("*.json"):
+        try:
+            files.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    files.sort(reverse=True)
+    for _, path in files[max_files:]:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+@traced("generate_graph")
+def generate_graph(researchers: List[Dict], directory: Path = GRAPH_DIR) -> str:
+    kept = prune(researchers)
+    graph_id = graph_key(kept)
+    path = Path(directory) / f"{graph_id}.json"
+    try:
+        # Refresh the mtime so graphs that are still being served are the last to be pruned.
+        os.utime(path)
+    except FileNotFoundError:
+        save_graph(build_graph(kept), graph_id, directory)
+        prune_graphs(directory)
+    return graph_id
@@ -0,0 +1,113 @@
+import re
+import unicodedata
+from functools import lru_cache
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "phd"}
+GIVEN_NAME_SIMILARITY = 0.85
+
+
+@lru_cache(maxsize=65536)
+def name_parts(name: str) -> Tuple[str, Tuple[str, ...]]:
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    if "," in text:
+        surname, _, given = text.partition(",")
+        text = f"{given} {surname}"
+    tokens = [t for t in re.split(r"[^a-z]+", text) if t and t not in NAME_SUFFIXES]
+    if not tokens:
+        return "", ()
+    return tokens[-1], tuple(tokens[:-1])
+
+
+def block_key(name: str) -> str:
+    surname, given = name_parts(name)
+    return f"{surname}|{given[0][0] if given else ''}"
+
+
+def _tokens_compatible(a: str, b: str) -> bool:
+    if len(a) == 1 or len(b) == 1:
+        return a[0] == b[0]
+    return a.startswith(b) or b.startswith(a) or SequenceMatcher(None, a, b).ratio() >= GIVEN_NAME_SIMILARITY
+
+
+def names_compatible(a: str, b: str) -> bool:
+    surname_a, given_a = name_parts(a)
+    surname_b, given_b = name_parts(b)
+    if surname_a != surname_b:
+        return False
+    if not given_a or not given_b:
+        return True
+    if not _tokens_compatible(given_a[0], given_b[0]):
+        return False
+    return all(_tokens_compatible(x, y) for x, y in zip(given_a[1:], given_b[1:]))
+
+
+def specificity(name: str) -> Tuple[int, int]:
+    _, given = name_parts(name)
+    return sum(1 for t in given if len(t) > 1), len(given)
+
+
+class AuthorIndex:
+    """Resolves author name variants to clusters, blocked on surname plus first initial."""
+
+    def __init__(self):
+        self._blocks: Dict[str, List[int]] = {}
+        self._by_name: Dict[str, List[int]] = {}
+        self._by_id: Dict[str, int] = {}
+        self.names: List[List[str]] = []
+        self.ids: List[Set[str]] = []
+
+    def find(self, name: str, author_id: str = "") -> Optional[int]:
+        if author_id and author_id in self._by_id:
+            return self._by_id[author_id]
+        if name in self._by_name:
+            named = [c for c in self._by_name[name] if not author_id or not self.ids[c]]
+            if len(named) > 1:
+                # Several identified researchers share this name; only an unidentified cluster is a safe match.
+                named = [c for c in named if not self.ids[c]]
+                return named[0] if len(named) == 1 else None
+            if named:
+                return named[0]
+        matches = [
+            cluster for cluster in self._blocks.get(block_key(name), [])
+            if not (author_id and self.ids[cluster])
+            and names_compatible(name, self.names[cluster][0])
+        ]
+        return matches[0] if len(matches) == 1 else None
+
+    def add(self, name: str, author_id: str = "", cluster: Optional[int] = None) -> int:
+        if cluster is None:
+            cluster = self.find(name, author_id)
+        if cluster is None:
+            cluster = len(self.names)
+            self.names.append([])
+            self.ids.append(set())
+            self._blocks.setdefault(block_key(name), []).append(cluster)
+        names = self.names[cluster]
+        if name not in names:
+            if names and specificity(name) > specificity(names[0]):
+                names.insert(0, name)
+            else:
+                names.append(name)
+        named = self._by_name.setdefault(name, [])
+        if cluster not in named:
+            named.append(cluster)
+        if author_id:
+            self.ids[cluster].add(author_id)
+            self._by_id[author_id] = cluster
+        return cluster
+
+    def canonical(self, cluster: int) -> str:
+        return self.names[cluster][0]
+
+
+def resolve_authors(authors: Iterable[Tuple[str, str]]) -> Tuple[AuthorIndex, Dict[Tuple[str, str], int]]:
+    """Clusters (name, author_id) pairs, adding the most specific names first."""
+    pairs = list(dict.fromkeys(authors))
+    index = AuthorIndex()
+    clusters = {}
+    for pair in sorted(pairs, key=lambda p: (not p[1], [-n for n in specificity(p[0])])):
+        clusters[pair] = index.add(*pair)
+    return index, clusters
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from db import create_job, get_job, update_job, cancel_job, list_jobs, job_session_ids, finish_job
+from pipeline import run_search, SearchCancelled
+from metrics import begin_trace, end_trace
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+TERMINAL_STATUSES = {"done", "failed", "cancelled"}
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="search-job")
+
+
+def query_key(refined: List[str], countries: List[str]) -> str:
+    normalized = {
+        "refined": sorted({t.strip().lower() for t in refined if t.strip()}),
+        "countries": sorted(set(countries)),
+    }
+    return hashlib.sha256(json.dumps(normalized).encode("utf-8")).hexdigest()
+
+
+def submit_search(session_id: int, refined: List[str], countries: List[str]) -> int:
+    params = {"refined": refined, "countries": countries}
+    job_id, created = create_job(query_key(refined, countries), params, session_id)
+    if created:
+        _executor.submit(run_job, job_id)
+    return job_id
+
+
+def cancel(job_id: int, session_id: int) -> bool:
+    return cancel_job(job_id, session_id)
+
+
+def run_job(job_id: int):
+    trace = begin_trace()
+    try:
+        _run_job(job_id)
+    finally:
+        end_trace(trace, f"search job {job_id}", endpoint="search_job")
+
+
+def _run_job(job_id: int):
+    job = get_job(job_id)
+    if job is None or job["status"] != "queued":
+        return
+    progress = {}
+
+    def report(stage: str, **counts):
+        progress.update(counts)
+        update_job(job_id, status="running", stage=stage, progress=progress)
+
+    def is_cancelled() -> bool:
+        return get_job(job_id)["status"] == "cancelled"
+
+    params = job["params"]
+    try:
+        session_ids = job_session_ids(job_id)
+        result = run_search(
+            params["refined"],
+            params["countries"],
+            session_id=session_ids[0] if session_ids else None,
+            progress=report,
+            is_cancelled=is_cancelled,
+        )
+    except SearchCancelled:
+        return
+    except Exception as exc:
+        update_job(job_id, status="failed", stage="failed", error=str(exc))
+        return
+    progress.update(ranked=len(result["researchers"]), graph_id=result["graph_id"])
+    finish_job(job_id, result["researchers"], progress)
+
+
+def resume_jobs():
+    for job in list_jobs(["running"]):
+        update_job(job["id"], status="queued", stage="queued")
+    for job in list_jobs(["queued"]):
+        _executor.submit(run_job, job["id"])
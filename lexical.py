@@ -0,0 +1,133 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from search import paper_key
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+LEXICAL_MAX_DOCS = int(os.environ.get("LEXICAL_MAX_DOCS", "200000"))
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "that", "the", "this", "to", "we", "with", "our", "which", "these", "using", "via", "can", "its",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z0-9][a-z0-9\-\+]*", (text or "").lower()) if t not in STOPWORDS]
+
+
+def paper_text(paper: Dict) -> str:
+    return f"{paper.get('title') or ''} {paper.get('summary') or ''}"
+
+
+class BM25Index:
+    """Incremental BM25 index over paper titles and abstracts, keyed by paper_key."""
+
+    def __init__(self, max_docs: int = LEXICAL_MAX_DOCS, k1: float = BM25_K1, b: float = BM25_B):
+        self.max_docs = max_docs
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._docs: Dict[str, int] = {}
+        self._lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._length_array = np.zeros(0, dtype=np.float32)
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _evict(self, keep: int):
+        cutoff = len(self._lengths) - keep
+        self._docs = {key: doc - cutoff for key, doc in self._docs.items() if doc >= cutoff}
+        self._lengths = self._lengths[cutoff:]
+        self._total_length = sum(self._lengths)
+        postings = {}
+        for term, docs in self._postings.items():
+            kept = {doc - cutoff: tf for doc, tf in docs.items() if doc >= cutoff}
+            if kept:
+                postings[term] = kept
+        self._postings = postings
+        self._arrays = {}
+        self._length_array = np.zeros(0, dtype=np.float32)
+
+    def _add_many(self, keyed: List[Tuple[str, Dict]]):
+        # Evict the oldest documents in bulk before adding, never while a request's papers are being scored.
+        missing = {key for key, _ in keyed if key not in self._docs}
+        if len(self._lengths) + len(missing) > self.max_docs:
+            self._evict(max(0, min(len(self._lengths), self.max_docs // 2 - len(missing))))
+        for key, paper in keyed:
+            if key not in self._docs:
+                self._add(key, paper)
+
+    def _add(self, key: str, paper: Dict):
+        doc = len(self._lengths)
+        terms = Counter(tokenize(paper_text(paper)))
+        self._docs[key] = doc
+        self._lengths.append(sum(terms.values()))
+        self._total_length += self._lengths[-1]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc] = tf
+            self._arrays.pop(term, None)
+
+    def add_papers(self, papers: Iterable[Dict]):
+        keyed = [(paper_key(paper), paper) for paper in papers]
+        with self._lock:
+            self._add_many([(key, paper) for key, paper in keyed if key != "title:"])
+
+    def _postings_array(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = self._arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+        return arrays
+
+    def _score(self, query: str) -> np.ndarray:
+        n = len(self._lengths)
+        scores = np.zeros(n, dtype=np.float32)
+        if not n:
+            return scores
+        if len(self._length_array) != n:
+            self._length_array = np.asarray(self._lengths, dtype=np.float32)
+        average = self._total_length / n or 1.0
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            docs, tfs = self._postings_array(term)
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = tfs + self.k1 * (1 - self.b + self.b * self._length_array[docs] / average)
+            scores[docs] += idf * tfs * (self.k1 + 1) / norm
+        return scores
+
+    def researcher_scores(self, researchers: List[Dict], query: str) -> List[float]:
+        owners, keys = [], []
+        for i, researcher in enumerate(researchers):
+            for paper in researcher.get("papers", []):
+                key = paper_key(paper)
+                if key != "title:":
+                    owners.append(i)
+                    keys.append((key, paper))
+        result = np.zeros(len(researchers), dtype=np.float32)
+        with self._lock:
+            self._add_many(keys)
+            scores = self._score(query)
+            docs = np.fromiter((self._docs.get(k, -1) for k, _ in keys), dtype=np.int64, count=len(keys))
+        valid = docs >= 0
+        np.maximum.at(result, np.asarray(owners, dtype=np.int64)[valid], scores[docs[valid]])
+        return result.tolist()
+
+
+PAPER_INDEX = BM25Index()
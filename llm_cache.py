@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+CACHE_PATH = Path("llm_cache.db")
+TTL_SECONDS = 7 * 24 * 3600
+MAX_ENTRIES = 5000
+
+logger = logging.getLogger("llm_cache")
+
+
+def cache_key(provider: str, model: str, temperature: float, prompt: str, api_key: str = "") -> str:
+    # Scoped to the API key so a revoked or invalid key is never served another user's completion.
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return f"{provider}|{model or ''}|{temperature:.3f}|{key_hash}|{prompt_hash}"
+
+
+class LLMCache:
+    def __init__(self, path: Path = CACHE_PATH, ttl: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    created_at REAL,
+                    accessed_at REAL,
+                    response TEXT
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT created_at, response FROM responses WHERE key = ?", (key,)).fetchone()
+            with conn:
+                if row is None or row[0] + self.ttl < now:
+                    if row is not None:
+                        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[1]
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, created_at, accessed_at, response) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, now, now, response),
+                    )
+                    (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+                    if count > self.max_entries:
+                        conn.execute(
+                            "DELETE FROM responses WHERE key IN "
+                            "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                            (count - self.max_entries,),
+                        )
+            except sqlite3.Error:
+                # A failed write only costs a future cache hit; the caller still gets its response.
+                logger.warning("could not cache LLM response", exc_info=True)
+
+    def lookup(self, key: str) -> Optional[str]:
+        response = self.get(key)
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def get_or_call(self, key: str, call: Callable[[], str]) -> str:
+        cached = self.lookup(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = Future()
+                self._inflight[key] = pending
+                owner = True
+            else:
+                owner = False
+                self.coalesced += 1
+        if not owner:
+            return pending.result()
+        try:
+            response = self.get(key)
+            if response is None:
+                response = call()
+        except Exception as exc:
+            pending.set_exception(exc)
+            raise
+        else:
+            pending.set_result(response)
+            self.put(key, response)
+            return response
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
@@ -1,9 +1,12 @@
 import os
+from typing import Iterator, Optional
 from adapters.openai_adapter import OpenAIAdapter
 from adapters.gemini_adapter import GeminiAdapter
 from adapters.groq_adapter import GroqAdapter
 from adapters.hf_adapter import HuggingFaceAdapter
 from adapters.ollama_adapter import OllamaAdapter
+from adapters.transport import transport_stats
+from llm_cache import LLMCache, cache_key
 
 
 ADAPTERS = {
@@ -13,14 +16,59 @@ ADAPTERS = {
     "huggingface": HuggingFaceAdapter(),
     "ollama": OllamaAdapter(),
 }
+CACHEABLE_MAX_TEMPERATURE = 0.3
+LLM_CACHE = LLMCache()
 
 
-def call_llm(provider: str, model: str, api_key: str, prompt: str, temperature: float = 0.2) -> str:
+def call_llm(provider: str, model: str, api_key: str, prompt: str, temperature: float = 0.2,
+             cache: Optional[bool] = None) -> str:
     provider_key = (provider or "").lower()
     if provider_key not in ADAPTERS:
         raise ValueError(f"Unsupported provider: {provider}")
     adapter = ADAPTERS[provider_key]
-    return adapter.generate(model=model, api_key=api_key, prompt=prompt, temperature=temperature)
+    if cache is None:
+        cache = temperature <= CACHEABLE_MAX_TEMPERATURE
+    if not cache:
+        return adapter.generate(model=model, api_key=api_key, prompt=prompt, temperature=temperature)
+    key = cache_key(provider_key, model, temperature, prompt, api_key)
+    return LLM_CACHE.get_or_call(
+        key, lambda: adapter.generate(model=model, api_key=api_key, prompt=prompt, temperature=temperature)
+    )
+
+
+def call_llm_stream(provider: str, model: str, api_key: str, prompt: str, temperature: float = 0.2,
+                    cache: Optional[bool] = None) -> Iterator[str]:
+    provider_key = (provider or "").lower()
+    if provider_key not in ADAPTERS:
+        raise ValueError(f"Unsupported provider: {provider}")
+    if cache is None:
+        cache = temperature <= CACHEABLE_MAX_TEMPERATURE
+    return _stream(ADAPTERS[provider_key], provider_key, model, api_key, prompt, temperature, cache)
+
+
+def _stream(adapter, provider_key: str, model: str, api_key: str, prompt: str, temperature: float,
+            cache: bool) -> Iterator[str]:
+    key = cache_key(provider_key, model, temperature, prompt, api_key)
+    cached = LLM_CACHE.lookup(key) if cache else None
+    if cached is not None:
+        yield cached
+        return
+    if not hasattr(adapter, "stream"):
+        response = adapter.generate(model=model, api_key=api_key, prompt=prompt, temperature=temperature)
+        if cache:
+            LLM_CACHE.put(key, response)
+        yield response
+        return
+    chunks = []
+    for chunk in adapter.stream(model=model, api_key=api_key, prompt=prompt, temperature=temperature):
+        chunks.append(chunk)
+        yield chunk
+    if cache:
+        LLM_CACHE.put(key, "".join(chunks).strip())
+
+
+def provider_stats():
+    return {**transport_stats(list(ADAPTERS)), "cache": LLM_CACHE.stats()}
 
 
 def redact_key(api_key: str) -> str:
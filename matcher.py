@@ -1,27 +1,177 @@
-from typing import List, Dict
-from nlp import embed_texts, similarity
+import os
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from nlp import embed_texts, embedding_model_id
+from search import paper_keys
+from identity import AuthorIndex, resolve_authors, specificity
+from db import get_session_embeddings, save_session_embeddings
+from metrics import traced
+from lexical import PAPER_INDEX, BM25Index
 
+FACET_WEIGHT = 0.5
+HYBRID_RANKING = os.environ.get("HYBRID_RANKING", "1") == "1"
+RRF_K = 60
+LEXICAL_PREFILTER_MIN = int(os.environ.get("LEXICAL_PREFILTER_MIN", "5000"))
+LEXICAL_PREFILTER_K = int(os.environ.get("LEXICAL_PREFILTER_K", "2000"))
 
+
+def _add_paper(entry: Dict, paper: Dict, known: set):
+    keys = paper_keys(paper)
+    if not known.isdisjoint(keys):
+        return
+    known.update(keys)
+    entry.setdefault("papers", []).append(paper)
+    if paper.get("title"):
+        entry.setdefault("topics", []).append(paper["title"])
+
+
+@traced("build_researcher_profiles")
 def build_researcher_profiles(papers: List[Dict]) -> List[Dict]:
-    profiles = {}
-    for paper in papers:
-        for author in paper.get("authors", []):
-            entry = profiles.setdefault(author, {"name": author, "papers": [], "topics": []})
-            entry["papers"].append(paper)
-            if paper.get("title"):
-                entry["topics"].append(paper["title"])
+    authorships = [
+        (paper, (author, (paper.get("author_ids") or {}).get(author, "")))
+        for paper in papers
+        for author in paper.get("authors", [])
+        if author
+    ]
+    index, clusters = resolve_authors(pair for _, pair in authorships)
+    profiles, seen = {}, {}
+    for paper, pair in authorships:
+        cluster = clusters[pair]
+        entry = profiles.get(cluster)
+        if entry is None:
+            entry = profiles[cluster] = {
+                "name": index.canonical(cluster),
+                "aliases": [n for n in index.names[cluster] if n != index.canonical(cluster)],
+                "author_ids": sorted(index.ids[cluster]),
+                "papers": [],
+                "topics": [],
+            }
+            seen[cluster] = set()
+        _add_paper(entry, paper, seen[cluster])
     return list(profiles.values())
 
 
-def rank_researchers(researchers: List[Dict], interest_topics: List[str], countries: List[str]) -> List[Dict]:
+def merge_researcher_profiles(existing: List[Dict], fresh: List[Dict]) -> List[Dict]:
+    index = AuthorIndex()
+    merged: Dict[int, Dict] = {}
+    ordered = sorted(
+        existing + fresh, key=lambda r: (not r.get("author_ids"), [-n for n in specificity(r["name"])])
+    )
+    for researcher in ordered:
+        names = [researcher["name"]] + researcher.get("aliases", [])
+        author_ids = researcher.get("author_ids") or [""]
+        cluster = index.find(researcher["name"], author_ids[0])
+        if cluster is None:
+            cluster = index.add(researcher["name"], author_ids[0])
+            merged[cluster] = researcher
+        else:
+            entry = merged[cluster]
+            known = {k for p in entry.get("papers", []) for k in paper_keys(p)}
+            for paper in researcher.get("papers", []):
+                _add_paper(entry, paper, known)
+            if specificity(researcher["name"]) > specificity(entry["name"]):
+                names.append(entry["name"])
+                entry["name"] = researcher["name"]
+            aliases = entry.setdefault("aliases", [])
+            aliases.extend(n for n in names if n != entry["name"] and n not in aliases)
+            entry["author_ids"] = sorted(set(entry.get("author_ids", [])) | set(researcher.get("author_ids", [])))
+        for name in names:
+            index.add(name, cluster=cluster)
+        for author_id in author_ids[1:]:
+            index.add(researcher["name"], author_id, cluster=cluster)
+    return list(merged.values())
+
+
+def interest_vectors(topics: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    embeddings = embed_texts([" ".join(topics)] + list(topics), normalize=True)
+    return embeddings[0], embeddings[1:]
+
+
+def session_interest_vectors(session_id: Optional[int], topics: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    if session_id is None:
+        return interest_vectors(topics)
+    stored = get_session_embeddings(session_id, embedding_model_id())
+    if stored is not None and stored["topics"] == list(topics):
+        dim = stored["dim"]
+        interest = np.frombuffer(stored["interest"], dtype=np.float32)
+        facets = np.frombuffer(stored["topic_vectors"], dtype=np.float32).reshape(-1, dim)
+        return interest, facets
+    interest, facets = interest_vectors(topics)
+    save_session_embeddings(
+        session_id, embedding_model_id(), list(topics), int(interest.shape[0]),
+        interest.astype(np.float32).tobytes(), facets.astype(np.float32).tobytes(),
+    )
+    return interest, facets
+
+
+def ranks(scores: np.ndarray) -> np.ndarray:
+    positions = np.empty(len(scores), dtype=np.int64)
+    positions[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return positions
+
+
+def reciprocal_rank_fusion(vector_scores: np.ndarray, lexical_scores: np.ndarray, k: int = RRF_K) -> np.ndarray:
+    fused = 1.0 / (k + ranks(vector_scores))
+    matched = lexical_scores > 0
+    fused[matched] += 1.0 / (k + ranks(lexical_scores)[matched])
+    return fused
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+@traced("rank_researchers")
+def rank_researchers(
+    researchers: List[Dict],
+    interest_topics: List[str],
+    countries: List[str],
+    top_k: Optional[int] = None,
+    interest_vector: Optional[np.ndarray] = None,
+    topic_vectors: Optional[np.ndarray] = None,
+    hybrid: Optional[bool] = None,
+    lexical_index: BM25Index = PAPER_INDEX,
+) -> List[Dict]:
     if not researchers:
         return []
-    interest_embedding = embed_texts([" ".join(interest_topics)])[0]
-    for researcher in researchers:
-        combined = " ".join(researcher.get("topics", []))
-        researcher_embedding = embed_texts([combined])[0]
-        topic_score = similarity(interest_embedding, researcher_embedding)
-        country_score = 0.1 if researcher.get("country") in countries else 0.0
-        publication_score = min(len(researcher.get("papers", [])) / 10.0, 1.0)
-        researcher["match_score"] = round(topic_score * 0.7 + publication_score * 0.2 + country_score * 0.1, 4)
-    return sorted(researchers, key=lambda x: x["match_score"], reverse=True)
+    hybrid = HYBRID_RANKING if hybrid is None else hybrid
+    if hybrid:
+        lexical_scores = np.array(
+            lexical_index.researcher_scores(researchers, " ".join(interest_topics)), dtype=np.float32
+        )
+        if len(researchers) > LEXICAL_PREFILTER_MIN:
+            paper_counts = np.array([len(r.get("papers", [])) for r in researchers])
+            keep = np.sort(np.lexsort((-paper_counts, -lexical_scores))[:LEXICAL_PREFILTER_K])
+            researchers = [researchers[i] for i in keep]
+            lexical_scores = lexical_scores[keep]
+    if interest_vector is None:
+        texts = [" ".join(interest_topics)] + [" ".join(r.get("topics", [])) for r in researchers]
+        embeddings = embed_texts(texts, normalize=True)
+        interest_vector, researcher_matrix = embeddings[0], embeddings[1:]
+    else:
+        researcher_matrix = embed_texts([" ".join(r.get("topics", [])) for r in researchers], normalize=True)
+    topic_scores = researcher_matrix @ interest_vector
+    if topic_vectors is not None and len(topic_vectors) > 1:
+        facet_scores = (researcher_matrix @ topic_vectors.T).max(axis=1)
+        topic_scores = topic_scores * (1 - FACET_WEIGHT) + facet_scores * FACET_WEIGHT
+
+    country_set = set(countries or [])
+    country_scores = np.array(
+        [0.1 if r.get("country") in country_set else 0.0 for r in researchers], dtype=np.float32
+    )
+    publication_scores = np.minimum(
+        np.array([len(r.get("papers", [])) for r in researchers], dtype=np.float32) / 10.0, 1.0
+    )
+    scores = topic_scores * 0.7 + publication_scores * 0.2 + country_scores * 0.1
+    for researcher, score in zip(researchers, scores):
+        researcher["match_score"] = round(float(score), 4)
+    if hybrid:
+        for researcher, score in zip(researchers, lexical_scores):
+            researcher["lexical_score"] = round(float(score), 4)
+        scores = reciprocal_rank_fusion(scores, lexical_scores)
+
+    order = top_k_indices(scores, top_k or len(researchers))
+    return [researchers[i] for i in order]
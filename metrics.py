@@ -0,0 +1,181 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from adapters.transport import Histogram
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOP_N = 25
+METRIC_PREFIX = "intrno"
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("metrics")
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, Labels], Histogram] = {}
+_counters: Dict[Tuple[str, Labels], float] = {}
+_collectors: List[Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = []
+_local = threading.local()
+_NOOP = nullcontext()
+
+
+def observe(name: str, value: float, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(STAGE_BUCKETS)
+        histogram.observe(value)
+
+
+def count(name: str, value: float = 1, **labels):
+    if not METRICS_ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        observe("stage_seconds", elapsed, stage=self.stage)
+        trace = getattr(_local, "trace", None)
+        if trace is not None:
+            trace["stages"][self.stage] = trace["stages"].get(self.stage, 0.0) + elapsed
+        return False
+
+
+def timed(stage: str):
+    return _Timer(stage) if METRICS_ENABLED else _NOOP
+
+
+def traced(stage: str):
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]):
+    _collectors.append(collector)
+
+
+def stats_collector(name: str, stats: Callable[[], Dict], **labels):
+    def collect():
+        for key, value in stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{name}_{key}", labels, value
+
+    register_collector(collect)
+
+
+def begin_trace() -> Optional[Dict]:
+    if not METRICS_ENABLED:
+        return None
+    trace = {"start": time.perf_counter(), "stages": {}, "profiler": None}
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            trace["profiler"] = profiler
+        except ValueError:
+            pass
+    _local.trace = trace
+    return trace
+
+
+def end_trace(trace: Optional[Dict], label: str, **labels) -> Optional[float]:
+    if trace is None:
+        return None
+    if getattr(_local, "trace", None) is trace:
+        _local.trace = None
+    total = time.perf_counter() - trace["start"]
+    observe("request_seconds", total, **labels)
+    breakdown = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in trace["stages"].items())
+    logger.info("%s total=%.1fms %s", label, total * 1000, breakdown)
+    profiler = trace["profiler"]
+    if profiler is not None:
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+        logger.info("profile for %s\n%s", label, output.getvalue())
+    return total
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + pairs + "}"
+
+
+def render_prometheus() -> str:
+    with _lock:
+        histograms = {
+            key: (list(h.buckets), list(h.counts), h.total, h.count) for key, h in _histograms.items()
+        }
+        counters = dict(_counters)
+    lines = []
+    typed = set()
+    for (name, labels), (buckets, counts, total, observations) in sorted(histograms.items()):
+        metric = f"{METRIC_PREFIX}_{name}"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, bucket_count in zip([str(b) for b in buckets] + ["+Inf"], counts):
+            cumulative += bucket_count
+            lines.append(f"{metric}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {observations}")
+    for (name, labels), value in sorted(counters.items()):
+        metric = f"{METRIC_PREFIX}_{name}_total"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    gauges: Dict[str, List[str]] = {}
+    for collector in _collectors:
+        try:
+            samples = list(collector())
+        except Exception:
+            logger.exception("metrics collector failed")
+            continue
+        for name, labels, value in samples:
+            metric = f"{METRIC_PREFIX}_{name}"
+            gauges.setdefault(metric, []).append(f"{metric}{_format_labels(tuple(sorted(labels.items())))} {value}")
+    for metric, samples in gauges.items():
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
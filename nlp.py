@@ -1,27 +1,200 @@
+import os
 import re
-from typing import List, Dict
-import pdfplumber
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from llm_router import call_llm
+import threading
+from pathlib import Path
+from typing import Callable, List, Dict, Iterator
+import numpy as np
+from llm_router import call_llm, call_llm_stream
+from embedding_cache import EmbeddingCache, cache_key
+from pdf_text import extract_text
+from metrics import traced
 
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_BATCH_SIZE = 64
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+EMBEDDING_SERVER_BACKEND = os.environ.get("EMBEDDING_SERVER_BACKEND", "torch")
+VECTOR_BACKEND = EMBEDDING_SERVER_BACKEND if EMBEDDING_BACKEND == "remote" else EMBEDDING_BACKEND
+ONNX_MODEL_DIR = Path(os.environ.get("ONNX_MODEL_DIR", "models"))
+MAX_SEQ_TOKENS = 256
+CHUNK_WORDS = 150
 _model = None
+_model_lock = threading.Lock()
+_backend = None
+_cache = EmbeddingCache()
 
 
-def get_model() -> SentenceTransformer:
+def get_model() -> "SentenceTransformer":
     global _model
     if _model is None:
-        _model = SentenceTransformer(MODEL_NAME)
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME)
     return _model
 
 
+class EmbeddingBackend:
+    name = "base"
+
+    @property
+    def model_id(self) -> str:
+        return f"{MODEL_NAME}#{self.name}"
+
+    def encode(self, texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, float]:
+        return {}
+
+
+class TorchBackend(EmbeddingBackend):
+    name = "torch"
+
+    @property
+    def model_id(self) -> str:
+        return MODEL_NAME
+
+    def encode(self, texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+        encoded = get_model().encode(
+            texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
+        return np.asarray(encoded, dtype=np.float32)
+
+
+class OnnxBackend(EmbeddingBackend):
+    def __init__(self, quantized: bool = False, model_dir: Path = ONNX_MODEL_DIR):
+        self.quantized = quantized
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.model_dir = Path(model_dir) / MODEL_NAME.replace("/", "__")
+        self._session = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _export(self, path: Path):
+        import torch
+        from transformers import AutoModel
+
+        model = AutoModel.from_pretrained(MODEL_NAME).eval()
+        inputs = self._tokenizer(["export"], return_tensors="pt")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        torch.onnx.export(
+            model,
+            (inputs["input_ids"], inputs["attention_mask"], inputs["token_type_ids"]),
+            str(path),
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                name: {0: "batch", 1: "sequence"}
+                for name in ("input_ids", "attention_mask", "token_type_ids", "last_hidden_state")
+            },
+            opset_version=14,
+        )
+
+    def _load(self):
+        with self._lock:
+            if self._session is not None:
+                return
+            import onnxruntime
+            from transformers import AutoTokenizer
+
+            self._tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+            path = self.model_dir / "model.onnx"
+            if not path.exists():
+                self._export(path)
+            if self.quantized:
+                quantized_path = self.model_dir / "model.int8.onnx"
+                if not quantized_path.exists():
+                    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                    quantize_dynamic(str(path), str(quantized_path), weight_type=QuantType.QInt8)
+                path = quantized_path
+            self._session = onnxruntime.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+
+    def encode(self, texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+        self._load()
+        input_names = {i.name for i in self._session.get_inputs()}
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = self._tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=MAX_SEQ_TOKENS, return_tensors="np",
+            )
+            feeds = {name: batch[name].astype(np.int64) for name in input_names}
+            hidden = self._session.run(None, feeds)[0]
+            mask = batch["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            outputs.append(normalize_rows(pooled))
+        return np.concatenate(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+
+
+def _remote_backend() -> EmbeddingBackend:
+    from embedding_server import RemoteBackend
+    return RemoteBackend()
+
+
+BACKENDS: Dict[str, Callable[[], EmbeddingBackend]] = {
+    "torch": TorchBackend,
+    "onnx": lambda: OnnxBackend(quantized=False),
+    "onnx-int8": lambda: OnnxBackend(quantized=True),
+    "remote": _remote_backend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], EmbeddingBackend]):
+    BACKENDS[name] = factory
+
+
+def get_backend() -> EmbeddingBackend:
+    global _backend
+    if _backend is None:
+        with _model_lock:
+            if _backend is None:
+                if EMBEDDING_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unsupported embedding backend: {EMBEDDING_BACKEND}")
+                _backend = BACKENDS[EMBEDDING_BACKEND]()
+    return _backend
+
+
+def set_backend(backend: EmbeddingBackend):
+    global _backend
+    _backend = backend
+
+
+def embedding_model_id() -> str:
+    return get_backend().model_id
+
+
+def backend_stats() -> Dict[str, float]:
+    return get_backend().stats()
+
+
+def chunk_text(text: str, chunk_words: int = CHUNK_WORDS) -> List[str]:
+    words = text.split()
+    if len(words) <= chunk_words:
+        return [text]
+    return [" ".join(words[i:i + chunk_words]) for i in range(0, len(words), chunk_words)]
+
+
+def encode_texts(texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    chunks, owners = [], []
+    for index, text in enumerate(texts):
+        for chunk in chunk_text(text):
+            chunks.append(chunk)
+            owners.append(index)
+    encoded = get_backend().encode(chunks, batch_size=batch_size)
+    if len(chunks) == len(texts):
+        return encoded
+    pooled = np.zeros((len(texts), encoded.shape[1]), dtype=np.float32)
+    np.add.at(pooled, np.asarray(owners), encoded)
+    return normalize_rows(pooled)
+
+
+def warm_up():
+    get_backend().encode(["warm up"])
+
+
 def extract_text_from_pdf(path: str) -> str:
-    text_parts = []
-    with pdfplumber.open(path) as pdf:
-        for page in pdf.pages:
-            text_parts.append(page.extract_text() or "")
-    return "\n".join(text_parts)
+    return extract_text(path)
 
 
 def extract_skills_topics(text: str) -> Dict[str, List[str]]:
@@ -43,13 +216,20 @@ def build_interest_profile(text: str, extra_interests: List[str]) -> Dict[str, L
     return {"skills": extracted["skills"], "methods": extracted["methods"], "topics": interests}
 
 
-def ask_clarifying_questions(provider: str, model: str, api_key: str, text: str) -> str:
-    prompt = (
+def clarifying_questions_prompt(text: str) -> str:
+    return (
         "You are an academic advisor. Based on the following background, ask 5 clarifying "
         "questions to better understand research interests.\n\n"
         f"Background:\n{text[:4000]}"
     )
-    return call_llm(provider, model, api_key, prompt)
+
+
+def ask_clarifying_questions(provider: str, model: str, api_key: str, text: str) -> str:
+    return call_llm(provider, model, api_key, clarifying_questions_prompt(text))
+
+
+def stream_clarifying_questions(provider: str, model: str, api_key: str, text: str) -> Iterator[str]:
+    return call_llm_stream(provider, model, api_key, clarifying_questions_prompt(text))
 
 
 def refine_interest_vector(provider: str, model: str, api_key: str, profile: Dict[str, List[str]]) -> List[str]:
@@ -63,10 +243,37 @@ def refine_interest_vector(provider: str, model: str, api_key: str, profile: Dic
     return [item.strip() for item in response.split(",") if item.strip()]
 
 
-def embed_texts(texts: List[str]):
-    model = get_model()
-    return model.encode(texts)
+@traced("embed_texts")
+def embed_texts(texts: List[str], normalize: bool = False, batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    model_id = embedding_model_id()
+    keys = [cache_key(text, model_id) for text in texts]
+    cached = _cache.get_many(list(dict.fromkeys(keys)))
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in pending:
+            pending[key] = text
+    if pending:
+        encoded = encode_texts(list(pending.values()), batch_size=batch_size)
+        fresh = dict(zip(pending.keys(), encoded))
+        _cache.put_many(fresh, model_id)
+        cached.update(fresh)
+    if not keys:
+        return np.zeros((0, 0), dtype=np.float32)
+    embeddings = np.stack([cached[key] for key in keys])
+    return normalize_rows(embeddings) if normalize else embeddings
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
 
 
 def similarity(a, b) -> float:
-    return float(cosine_similarity([a], [b])[0][0])
+    a, b = normalize_rows(np.asarray(a)), normalize_rows(np.asarray(b))
+    return float(np.dot(a, b))
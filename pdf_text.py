@@ -0,0 +1,149 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+CACHE_PATH = Path("pdf_text.db")
+PDF_MAX_BYTES = int(os.environ.get("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "40"))
+PDF_TEXT_LIMIT = int(os.environ.get("PDF_TEXT_LIMIT", "12000"))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = 4
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class PDFTooLarge(ValueError):
+    def __init__(self, size: int):
+        super().__init__(f"PDF is {size} bytes; the limit is {PDF_MAX_BYTES}")
+        self.size = size
+
+
+def check_size(path: str):
+    size = os.path.getsize(path)
+    if size > PDF_MAX_BYTES:
+        raise PDFTooLarge(size)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TextCache:
+    def __init__(self, path: Path = CACHE_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS texts (hash TEXT PRIMARY KEY, created_at REAL, text TEXT)"
+            )
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute("SELECT text FROM texts WHERE hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO texts (hash, created_at, text) VALUES (?, ?, ?)",
+                    (key, time.time(), text),
+                )
+
+
+_cache = TextCache()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+        return _executor
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[str]:
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _serial_pages(pdf, page_count: int) -> Iterator[str]:
+    for page in pdf.pages[:page_count]:
+        yield page.extract_text() or ""
+        page.close()
+
+
+def _parallel_pages(path: str, page_count: int) -> Iterator[str]:
+    executor = _get_executor()
+    starts = iter(range(0, page_count, PAGES_PER_TASK))
+    pending = deque()
+
+    def submit_next():
+        start = next(starts, None)
+        if start is not None:
+            pending.append(executor.submit(_extract_pages, path, start, min(start + PAGES_PER_TASK, page_count)))
+
+    for _ in range(PDF_WORKERS):
+        submit_next()
+    try:
+        while pending:
+            pages = pending.popleft().result()
+            submit_next()
+            yield from pages
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def iter_pdf_pages(path: str, max_pages: int = PDF_MAX_PAGES) -> Iterator[str]:
+    import pdfplumber
+
+    check_size(path)
+    with pdfplumber.open(path) as pdf:
+        page_count = min(len(pdf.pages), max_pages)
+        if page_count < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS <= 1:
+            yield from _serial_pages(pdf, page_count)
+            return
+    yield from _parallel_pages(path, page_count)
+
+
+def extract_text(path: str, limit: int = PDF_TEXT_LIMIT, max_pages: int = PDF_MAX_PAGES) -> str:
+    check_size(path)
+    key = f"{file_hash(path)}:{limit}:{max_pages}"
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    parts, length = [], 0
+    pages = iter_pdf_pages(path, max_pages)
+    try:
+        for text in pages:
+            parts.append(text)
+            length += len(text) + 1
+            if length >= limit:
+                break
+    finally:
+        pages.close()
+    text = "\n".join(parts)[:limit]
+    _cache.put(key, text)
+    return text
@@ -0,0 +1,84 @@
+import os
+import time
+from typing import Callable, Dict, List, Optional
+from pathlib import Path
+from nlp import embed_texts, VECTOR_BACKEND
+from search import discover
+from matcher import build_researcher_profiles, merge_researcher_profiles, rank_researchers, session_interest_vectors
+from researcher_index import INDEX_DIR, ResearcherIndex
+from scraper import enrich_researchers
+from graph import generate_graph
+from metrics import timed
+
+ENRICH_TOP_N = int(os.environ.get("ENRICH_TOP_N", "25"))
+INDEX_TOP_K = int(os.environ.get("INDEX_TOP_K", "50"))
+INDEX_MIN_SCORE = float(os.environ.get("INDEX_MIN_SCORE", "0.35"))
+DISCOVER_LIMIT = int(os.environ.get("DISCOVER_LIMIT", "15"))
+ENRICH_RETRY_SECONDS = float(os.environ.get("ENRICH_RETRY_SECONDS", str(7 * 24 * 3600)))
+RESEARCHER_INDEX = ResearcherIndex(
+    INDEX_DIR if VECTOR_BACKEND == "torch" else Path(f"{INDEX_DIR}-{VECTOR_BACKEND}")
+)
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+def needs_enrichment(researcher: Dict, now: float) -> bool:
+    if researcher.get("homepage"):
+        return False
+    return now - (researcher.get("enriched_at") or 0) >= ENRICH_RETRY_SECONDS
+
+
+def run_search(
+    refined: List[str],
+    countries: List[str],
+    session_id: Optional[int] = None,
+    progress: Optional[Callable[..., None]] = None,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+) -> Dict:
+    def stage(name: str, **counts):
+        if is_cancelled is not None and is_cancelled():
+            raise SearchCancelled(name)
+        if progress is not None:
+            progress(name, **counts)
+
+    stage("discovering")
+    query = " ".join(refined)
+    interest_vector, topic_vectors = session_interest_vectors(session_id, refined)
+    with timed("index_search"):
+        indexed = [
+            entry for entry, score in RESEARCHER_INDEX.search(interest_vector, k=INDEX_TOP_K)
+            if score >= INDEX_MIN_SCORE
+        ]
+    live_limit = max(1, DISCOVER_LIMIT // 3) if len(indexed) >= INDEX_TOP_K // 2 else DISCOVER_LIMIT
+    with timed("discover"):
+        papers = discover(query, limit=live_limit)
+    researchers = merge_researcher_profiles(indexed, build_researcher_profiles(papers))
+
+    stage("ranking", papers=len(papers), researchers=len(researchers))
+    ranked = rank_researchers(
+        researchers, refined, countries, interest_vector=interest_vector, topic_vectors=topic_vectors
+    )
+
+    now = time.time()
+    to_enrich = [r for r in ranked[:ENRICH_TOP_N] if needs_enrichment(r, now)]
+    stage("enriching", ranked=len(ranked), enriching=len(to_enrich))
+    with timed("enrich"):
+        enrichments = enrich_researchers(to_enrich)
+    for researcher, enrichment in zip(to_enrich, enrichments):
+        researcher.update(enrichment)
+    for researcher in ranked:
+        for key in ("homepage", "scholar", "linkedin", "email"):
+            researcher.setdefault(key, "")
+        researcher["research_areas"] = refined[:5]
+        researcher["top_papers"] = [p.get("title") for p in researcher.get("papers", [])[:3]]
+        researcher["country"] = researcher.get("country", "")
+        researcher["institution"] = researcher.get("institution", "")
+
+    stage("saving", enriched=sum(1 for e in enrichments if e.get("homepage")))
+    if ranked:
+        with timed("index_upsert"):
+            RESEARCHER_INDEX.upsert_many(ranked, embed_texts([" ".join(r.get("topics", [])) for r in ranked]))
+    graph_id = generate_graph(ranked) if ranked else ""
+    return {"researchers": ranked, "graph_id": graph_id}
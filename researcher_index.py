@@ -0,0 +1,251 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_DIR = Path("researcher_index")
+N_LISTS = 64
+N_PROBE = 8
+TRAIN_MIN_SIZE = 2048
+KMEANS_ITERATIONS = 10
+MAX_STORED_PAPERS = 25
+PROFILE_FIELDS = (
+    "name", "aliases", "author_ids", "institution", "country", "papers", "topics",
+    "homepage", "scholar", "linkedin", "email", "enriched_at",
+)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(n_clusters):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.mean(axis=0)
+            else:
+                centroids[cluster] = vectors[rng.integers(len(vectors))]
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class ResearcherIndex:
+    def __init__(self, path: Path = INDEX_DIR, n_lists: int = N_LISTS, n_probe: int = N_PROBE,
+                 train_min_size: int = TRAIN_MIN_SIZE):
+        self.path = Path(path)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_min_size = train_min_size
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._vectors: Optional[np.memmap] = None
+        self._dim = 0
+        self._capacity = 0
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._assignment: List[int] = []
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._loaded = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._keys)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path / "profiles.db", check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    row INTEGER PRIMARY KEY,
+                    key TEXT UNIQUE,
+                    list INTEGER,
+                    profile TEXT
+                )
+                """
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        return self._conn
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        conn = self._connection()
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        self._dim = int(meta.get("dim", 0))
+        self._capacity = int(meta.get("capacity", 0))
+        self._trained_size = int(meta.get("trained_size", 0))
+        for row, key, list_id in conn.execute("SELECT row, key, list FROM entries ORDER BY row"):
+            self._keys.append(key)
+            self._rows[key] = row
+            self._assignment.append(list_id)
+        centroids_path = self.path / "centroids.npy"
+        if centroids_path.exists() and self._trained_size:
+            self._centroids = np.load(centroids_path)
+            self._lists = [[] for _ in range(len(self._centroids))]
+            for row, list_id in enumerate(self._assignment):
+                self._lists[list_id].append(row)
+        if self._capacity:
+            self._vectors = np.memmap(
+                self.path / "vectors.f32", dtype=np.float32, mode="r+", shape=(self._capacity, self._dim)
+            )
+
+    def _ensure_capacity(self, size: int, dim: int):
+        if self._dim and dim != self._dim:
+            raise ValueError(f"Index dimension is {self._dim}, got {dim}")
+        self._dim = dim
+        if size <= self._capacity:
+            return
+        capacity = max(size, self._capacity * 2, 1024)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        vectors_path = self.path / "vectors.f32"
+        with open(vectors_path, "ab") as handle:
+            handle.truncate(capacity * dim * 4)
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        self._capacity = capacity
+
+    def _nearest_list(self, vectors: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.full(len(vectors), -1, dtype=np.int64)
+        return np.argmax(vectors @ self._centroids.T, axis=1)
+
+    def _train(self):
+        size = len(self._keys)
+        data = np.asarray(self._vectors[:size])
+        n_lists = min(self.n_lists, size)
+        sample = data
+        if size > n_lists * 256:
+            rng = np.random.default_rng(0)
+            sample = data[rng.choice(size, size=n_lists * 256, replace=False)]
+        self._centroids = kmeans(sample, n_lists)
+        self._assignment = [int(a) for a in self._nearest_list(data)]
+        self._lists = [[] for _ in range(n_lists)]
+        self._list_arrays = {}
+        for row, list_id in enumerate(self._assignment):
+            self._lists[list_id].append(row)
+        self._trained_size = size
+        np.save(self.path / "centroids.npy", self._centroids)
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "UPDATE entries SET list = ? WHERE row = ?", [(a, row) for row, a in enumerate(self._assignment)]
+            )
+
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        rows = self._list_arrays.get(list_id)
+        if rows is None:
+            rows = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = rows
+        return rows
+
+    def _key(self, profile: Dict) -> str:
+        author_ids = sorted(profile.get("author_ids") or [])
+        for author_id in author_ids:
+            if f"id:{author_id}" in self._rows:
+                return f"id:{author_id}"
+        return f"id:{author_ids[0]}" if author_ids else profile["name"]
+
+    def upsert_many(self, profiles: List[Dict], vectors: np.ndarray):
+        if not profiles:
+            return
+        vectors = _normalize(vectors)
+        with self._lock:
+            self._load()
+            conn = self._connection()
+            keys = [self._key(p) for p in profiles]
+            self._ensure_capacity(len(self._keys) + len(set(keys) - set(self._rows)), vectors.shape[1])
+            lists = self._nearest_list(vectors)
+            rows = []
+            for key, profile, vector, list_id in zip(keys, profiles, vectors, lists):
+                row = self._rows.get(key)
+                if row is None:
+                    row = len(self._keys)
+                    self._keys.append(key)
+                    self._rows[key] = row
+                    self._assignment.append(-1)
+                previous = self._assignment[row]
+                if self._centroids is not None and previous != list_id:
+                    if previous >= 0:
+                        self._lists[previous].remove(row)
+                        self._list_arrays.pop(previous, None)
+                    self._lists[list_id].append(row)
+                    self._list_arrays.pop(int(list_id), None)
+                self._assignment[row] = int(list_id)
+                self._vectors[row] = vector
+                stored = {field: profile[field] for field in PROFILE_FIELDS if field in profile}
+                for field in ("papers", "topics"):
+                    if field in stored:
+                        stored[field] = stored[field][:MAX_STORED_PAPERS]
+                rows.append((row, key, int(list_id), json.dumps(stored)))
+            self._vectors.flush()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (row, key, list, profile) VALUES (?, ?, ?, ?)", rows
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("dim", str(self._dim)), ("capacity", str(self._capacity)),
+                     ("trained_size", str(self._trained_size))],
+                )
+            size = len(self._keys)
+            if size >= self.train_min_size and (self._centroids is None or size >= 4 * self._trained_size):
+                self._train()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('trained_size', ?)", (str(size),)
+                    )
+
+    def search_rows(self, query: np.ndarray, k: int = 10, n_probe: Optional[int] = None) -> List[Tuple[int, float]]:
+        with self._lock:
+            self._load()
+            size = len(self._keys)
+            if not size:
+                return []
+            query = _normalize(query.reshape(1, -1))[0]
+            if self._centroids is None:
+                rows = np.arange(size)
+                candidates = np.asarray(self._vectors[:size])
+            else:
+                probe = min(n_probe or self.n_probe, len(self._centroids))
+                nearest = np.argpartition(-(self._centroids @ query), probe - 1)[:probe]
+                rows = np.concatenate([self._list_rows(int(list_id)) for list_id in nearest])
+                if not len(rows):
+                    return []
+                candidates = self._vectors[rows]
+            scores = candidates @ query
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def search(self, query: np.ndarray, k: int = 10, n_probe: Optional[int] = None) -> List[Tuple[Dict, float]]:
+        hits = self.search_rows(query, k=k, n_probe=n_probe)
+        if not hits:
+            return []
+        with self._lock:
+            conn = self._connection()
+            placeholders = ",".join("?" * len(hits))
+            profiles = dict(conn.execute(
+                f"SELECT row, profile FROM entries WHERE row IN ({placeholders})", [row for row, _ in hits]
+            ).fetchall())
+        return [(json.loads(profiles[row]), score) for row, score in hits if row in profiles]
@@ -1,45 +1,135 @@
+import logging
+import os
 import re
 import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
 import requests
 import requests_cache
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
 from urllib.robotparser import RobotFileParser
-from duckduckgo_search import DDGS
-import trafilatura
+from metrics import count, traced
 
 requests_cache.install_cache("research_cache", expire_after=3600)
 
-RATE_LIMIT_SECONDS = 1.0
-_last_request_time = 0.0
-
-
-def _rate_limit():
-    global _last_request_time
-    elapsed = time.time() - _last_request_time
-    if elapsed < RATE_LIMIT_SECONDS:
-        time.sleep(RATE_LIMIT_SECONDS - elapsed)
-    _last_request_time = time.time()
+RATE_LIMIT_SECONDS = float(os.environ.get("SCRAPER_RATE_LIMIT_SECONDS", "1.0"))
+USER_AGENT = "AcademicResearcherDiscoveryBot/1.0"
+ROBOTS_TTL_SECONDS = 6 * 3600
+ROBOTS_NEGATIVE_TTL_SECONDS = 600
+ROBOTS_CACHE_SIZE = 1024
+SEARCH_HOST = "duckduckgo.com"
+SEARCH_RATE_LIMIT_SECONDS = float(os.environ.get("SEARCH_RATE_LIMIT_SECONDS", "0"))
+ENRICH_MAX_WORKERS = int(os.environ.get("ENRICH_MAX_WORKERS", "8"))
+ENRICH_DEADLINE_SECONDS = float(os.environ.get("ENRICH_DEADLINE_SECONDS", "20"))
+_EMPTY_ENRICHMENT = {"homepage": "", "scholar": "", "linkedin": "", "email": ""}
+
+logger = logging.getLogger("scraper")
+_search_client_factory: Optional[Callable] = None
+_rate_lock = threading.Lock()
+_next_request_time: Dict[str, float] = {}
+
+
+def _rate_limit(host: str, delay: float = RATE_LIMIT_SECONDS):
+    with _rate_lock:
+        now = time.monotonic()
+        scheduled = max(now, _next_request_time.get(host, 0.0))
+        _next_request_time[host] = scheduled + delay
+    if scheduled > now:
+        time.sleep(scheduled - now)
+
+
+class RobotsCache:
+    def __init__(self, ttl: float = ROBOTS_TTL_SECONDS, negative_ttl: float = ROBOTS_NEGATIVE_TTL_SECONDS,
+                 max_size: int = ROBOTS_CACHE_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Optional[RobotFileParser]]]" = OrderedDict()
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, origin: str):
+        entry = self._entries.get(origin)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[origin]
+            return None
+        self._entries.move_to_end(origin)
+        return entry
+
+    def _fetch(self, origin: str) -> Tuple[float, Optional[RobotFileParser]]:
+        rp = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = requests.get(rp.url, timeout=10, headers={"User-Agent": USER_AGENT})
+        except Exception:
+            return time.monotonic() + self.negative_ttl, None
+        if response.status_code in (401, 403):
+            rp.disallow_all = True
+        elif 400 <= response.status_code < 500:
+            rp.allow_all = True
+        elif response.status_code >= 500:
+            return time.monotonic() + self.negative_ttl, None
+        else:
+            rp.parse(response.text.splitlines())
+        return time.monotonic() + self.ttl, rp
+
+    def parser(self, url: str) -> Optional[RobotFileParser]:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            entry = self._lookup(origin)
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+            fetch_lock = self._fetch_locks.setdefault(origin, threading.Lock())
+        with fetch_lock:
+            with self._lock:
+                entry = self._lookup(origin)
+            if entry is None:
+                entry = self._fetch(origin)
+                with self._lock:
+                    self.misses += 1
+                    self._entries[origin] = entry
+                    self._entries.move_to_end(origin)
+                    while len(self._entries) > self.max_size:
+                        evicted, _ = self._entries.popitem(last=False)
+                        self._fetch_locks.pop(evicted, None)
+        return entry[1]
+
+    def allowed(self, url: str) -> bool:
+        rp = self.parser(url)
+        return rp is not None and rp.can_fetch("*", url)
+
+    def crawl_delay(self, url: str) -> float:
+        rp = self.parser(url)
+        delay = rp.crawl_delay("*") if rp is not None else None
+        return max(RATE_LIMIT_SECONDS, float(delay or 0))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+ROBOTS = RobotsCache()
 
 
 def robots_allowed(url: str) -> bool:
-    parsed = urlparse(url)
-    robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-    rp = RobotFileParser()
-    try:
-        rp.set_url(robots_url)
-        rp.read()
-    except Exception:
-        return False
-    return rp.can_fetch("*", url)
+    return ROBOTS.allowed(url)
 
 
 def fetch_page(url: str) -> str:
     if not robots_allowed(url):
         return ""
-    _rate_limit()
-    response = requests.get(url, timeout=20, headers={"User-Agent": "AcademicResearcherDiscoveryBot/1.0"})
+    _rate_limit(urlparse(url).netloc, ROBOTS.crawl_delay(url))
+    response = requests.get(url, timeout=20, headers={"User-Agent": USER_AGENT})
     response.raise_for_status()
+    count("external_requests", service="homepage", cached=str(getattr(response, "from_cache", False)).lower())
+    count("bytes_fetched", len(response.content), service="homepage")
     return response.text
 
 
@@ -48,6 +138,9 @@ def extract_emails(text: str):
 
 
 def extract_profile_info(url: str) -> dict:
+    import trafilatura
+    from bs4 import BeautifulSoup
+
     html = fetch_page(url)
     if not html:
         return {}
@@ -58,9 +151,23 @@ def extract_profile_info(url: str) -> dict:
     return {"title": title, "emails": emails, "text": text[:5000]}
 
 
+def set_search_client(factory: Optional[Callable]):
+    global _search_client_factory
+    _search_client_factory = factory
+
+
 def search_web(query: str, max_results: int = 5):
+    if _search_client_factory is None:
+        from duckduckgo_search import DDGS
+
+        factory = DDGS
+    else:
+        factory = _search_client_factory
     results = []
-    with DDGS() as ddgs:
+    if SEARCH_RATE_LIMIT_SECONDS > 0:
+        _rate_limit(SEARCH_HOST, SEARCH_RATE_LIMIT_SECONDS)
+    count("external_requests", service="duckduckgo")
+    with factory() as ddgs:
         for r in ddgs.text(query, max_results=max_results):
             results.append(r)
     return results
@@ -81,8 +188,37 @@ def find_researcher_links(name: str, institution: str = "") -> dict:
     return {"homepage": homepage, "scholar": scholar, "linkedin": linkedin}
 
 
+@traced("enrich_researcher")
 def enrich_researcher(name: str, institution: str = "") -> dict:
     links = find_researcher_links(name, institution)
     profile = extract_profile_info(links.get("homepage", "")) if links.get("homepage") else {}
     email = profile.get("emails", [""])[0] if profile.get("emails") else ""
     return {**links, "email": email}
+
+
+def enrich_researchers(
+    researchers: List[Dict],
+    max_workers: int = ENRICH_MAX_WORKERS,
+    deadline: float = ENRICH_DEADLINE_SECONDS,
+) -> List[Dict]:
+    if not researchers:
+        return []
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="enrich")
+    futures = [
+        executor.submit(enrich_researcher, r["name"], r.get("institution", "")) for r in researchers
+    ]
+    wait(futures, timeout=deadline)
+    executor.shutdown(wait=False, cancel_futures=True)
+    enrichments, timed_out = [], []
+    for researcher, future in zip(researchers, futures):
+        if not future.done() or future.cancelled():
+            timed_out.append(researcher["name"])
+            enrichments.append(dict(_EMPTY_ENRICHMENT))
+        elif future.exception() is not None:
+            logger.warning("enrichment of %s failed: %r", researcher["name"], future.exception())
+            enrichments.append(dict(_EMPTY_ENRICHMENT))
+        else:
+            enrichments.append({**_EMPTY_ENRICHMENT, **future.result(), "enriched_at": time.time()})
+    if timed_out:
+        logger.warning("enrichment timed out after %.1fs: %s", deadline, ", ".join(timed_out))
+    return enrichments
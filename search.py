@@ -1,37 +1,151 @@
+import inspect
+import logging
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
 import requests
-from typing import List, Dict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from typing import Callable, Iterator, List, Dict, Optional
 from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from metrics import count, traced
 
-ARXIV_URL = "http://export.arxiv.org/api/query"
-SEMANTIC_SCHOLAR_URL = "https://api.semanticscholar.org/graph/v1/paper/search"
+ARXIV_URL = os.environ.get("ARXIV_URL", "http://export.arxiv.org/api/query")
+SEMANTIC_SCHOLAR_URL = os.environ.get(
+    "SEMANTIC_SCHOLAR_URL", "https://api.semanticscholar.org/graph/v1/paper/search"
+)
+DISCOVERY_BUDGET_SECONDS = 12.0
+SOURCE_TIMEOUT = (5, 30)
+ARXIV_PAGE_SIZE = int(os.environ.get("ARXIV_PAGE_SIZE", "100"))
+ARXIV_PAGE_DELAY_SECONDS = float(os.environ.get("ARXIV_PAGE_DELAY_SECONDS", "3.0"))
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+ARXIV_NS = "{http://arxiv.org/schemas/atom}"
+OPENSEARCH_NS = "{http://a9.com/-/spec/opensearch/1.1/}"
 
+SOURCES: Dict[str, Callable[..., List[Dict]]] = {}
+_SINCE_SOURCES = set()
+logger = logging.getLogger("search")
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
-def search_arxiv(query: str, max_results: int = 20) -> List[Dict]:
-    params = {
-        "search_query": f"all:{query}",
-        "start": 0,
-        "max_results": max_results,
+
+def register_source(name: str, fetch: Callable[..., List[Dict]]):
+    """Sources are called as fetch(query, limit), plus since=<datetime> if they accept a since argument."""
+    SOURCES[name] = fetch
+    try:
+        params = inspect.signature(fetch).parameters.values()
+    except (TypeError, ValueError):
+        params = []
+    if any(p.name == "since" or p.kind == p.VAR_KEYWORD for p in params):
+        _SINCE_SOURCES.add(name)
+    else:
+        _SINCE_SOURCES.discard(name)
+
+
+def _record_fetch(service: str, size: int):
+    count("external_requests", service=service)
+    count("bytes_fetched", size, service=service)
+
+
+def _text(entry, tag: str) -> str:
+    return " ".join((entry.findtext(tag) or "").split())
+
+
+def _parse_arxiv_entry(entry) -> Dict:
+    entry_id = _text(entry, f"{ATOM_NS}id")
+    primary = entry.find(f"{ARXIV_NS}primary_category")
+    return {
+        "title": _text(entry, f"{ATOM_NS}title"),
+        "summary": _text(entry, f"{ATOM_NS}summary"),
+        "authors": [_text(author, f"{ATOM_NS}name") for author in entry.findall(f"{ATOM_NS}author")],
+        "doi": _text(entry, f"{ARXIV_NS}doi"),
+        "published": _text(entry, f"{ATOM_NS}published")[:10],
+        "updated": _text(entry, f"{ATOM_NS}updated")[:10],
+        "arxiv_id": entry_id.rsplit("/abs/", 1)[-1] if "/abs/" in entry_id else "",
+        "url": entry_id,
+        "primary_category": primary.get("term", "") if primary is not None else "",
+        "categories": [c.get("term") for c in entry.findall(f"{ATOM_NS}category") if c.get("term")],
+        "source": "arXiv",
     }
-    response = requests.get(ARXIV_URL, params=params, timeout=30)
-    response.raise_for_status()
-    entries = response.text.split("<entry>")[1:]
+
+
+def _iter_feed(stream, feed: Dict) -> Iterator[Dict]:
+    root = None
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        if element.tag == f"{ATOM_NS}entry":
+            yield _parse_arxiv_entry(element)
+            root.remove(element)
+        elif element.tag == f"{OPENSEARCH_NS}totalResults":
+            feed["total"] = int(element.text or 0)
+
+
+def harvest_arxiv(query: str, limit: Optional[int] = None, since: Optional[datetime] = None,
+                  page_size: int = ARXIV_PAGE_SIZE) -> Iterator[Dict]:
+    search_query = f"all:{query}"
+    params = {}
+    if since is not None:
+        search_query += f" AND submittedDate:[{since:%Y%m%d%H%M} TO 299912312359]"
+        params.update(sortBy="submittedDate", sortOrder="descending")
+    start = 0
+    last_request = 0.0
+    while limit is None or start < limit:
+        size = page_size if limit is None else min(page_size, limit - start)
+        wait = last_request + ARXIV_PAGE_DELAY_SECONDS - time.monotonic()
+        if start and wait > 0:
+            time.sleep(wait)
+        last_request = time.monotonic()
+        with _session.get(
+            ARXIV_URL,
+            params={**params, "search_query": search_query, "start": start, "max_results": size},
+            timeout=SOURCE_TIMEOUT,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            received = 0
+            feed = {}
+            try:
+                for paper in _iter_feed(response.raw, feed):
+                    received += 1
+                    yield paper
+            finally:
+                _record_fetch("arxiv", response.raw.tell())
+        if received < size or start + received >= feed.get("total", float("inf")):
+            return
+        start += received
+
+
+@traced("search_arxiv")
+def search_arxiv(query: str, max_results: int = 20, since: Optional[datetime] = None,
+                 budget: Optional[float] = None) -> List[Dict]:
+    deadline = None if budget is None else time.monotonic() + budget
     results = []
-    for entry in entries:
-        title = _extract_tag(entry, "title")
-        summary = _extract_tag(entry, "summary")
-        authors = [a.split("</name>")[0] for a in entry.split("<name>")[1:]]
-        results.append({"title": title, "summary": summary, "authors": authors, "source": "arXiv"})
+    for paper in harvest_arxiv(query, limit=max_results, since=since):
+        results.append(paper)
+        if deadline is not None and time.monotonic() >= deadline:
+            break
     return results
 
 
-def search_semantic_scholar(query: str, limit: int = 20) -> List[Dict]:
+@traced("search_semantic_scholar")
+def search_semantic_scholar(query: str, limit: int = 20, since: Optional[datetime] = None) -> List[Dict]:
     params = {
         "query": query,
         "limit": limit,
-        "fields": "title,abstract,authors,url,publicationDate"
+        "fields": "title,abstract,authors,url,publicationDate,externalIds"
     }
-    response = requests.get(SEMANTIC_SCHOLAR_URL, params=params, timeout=30)
+    if since is not None:
+        params["publicationDateOrYear"] = f"{since:%Y-%m-%d}:"
+    response = _session.get(SEMANTIC_SCHOLAR_URL, params=params, timeout=SOURCE_TIMEOUT)
     response.raise_for_status()
+    _record_fetch("semantic_scholar", len(response.content))
     data = response.json()
     results = []
     for paper in data.get("data", []):
@@ -39,17 +153,114 @@ def search_semantic_scholar(query: str, limit: int = 20) -> List[Dict]:
             "title": paper.get("title"),
             "summary": paper.get("abstract") or "",
             "authors": [a.get("name") for a in paper.get("authors", [])],
+            "author_ids": {a["name"]: a["authorId"] for a in paper.get("authors", []) if a.get("authorId")},
             "url": paper.get("url"),
+            "doi": (paper.get("externalIds") or {}).get("DOI") or "",
+            "published": paper.get("publicationDate") or "",
             "source": "Semantic Scholar",
         })
     return results
 
 
-def _extract_tag(entry: str, tag: str) -> str:
-    if f"<{tag}>" not in entry:
-        return ""
-    return entry.split(f"<{tag}>")[1].split(f"</{tag}>")[0].replace("\n", " ").strip()
+def paper_keys(paper: Dict) -> List[str]:
+    keys = []
+    doi = (paper.get("doi") or "").strip().lower()
+    if doi:
+        keys.append(f"doi:{doi}")
+    title = re.sub(r"[^a-z0-9]+", " ", (paper.get("title") or "").lower()).strip()
+    if title:
+        keys.append(f"title:{title}")
+    return keys
+
+
+def paper_key(paper: Dict) -> str:
+    keys = paper_keys(paper)
+    return keys[0] if keys else "title:"
+
+
+def _find_paper(merged: Dict[str, Dict], keys: List[str]) -> Optional[Dict]:
+    doi = keys[0] if keys[0].startswith("doi:") else ""
+    for key in keys:
+        existing = merged.get(key)
+        if existing is not None and (not doi or not existing.get("doi") or paper_key(existing) == doi):
+            return existing
+    return None
+
+
+def merge_paper(existing: Dict, paper: Dict) -> Dict:
+    for field, value in paper.items():
+        if value and not existing.get(field):
+            existing[field] = value
+    authors = existing.setdefault("authors", [])
+    for author in paper.get("authors", []):
+        if author not in authors:
+            authors.append(author)
+    if paper.get("author_ids"):
+        existing["author_ids"] = {**paper["author_ids"], **(existing.get("author_ids") or {})}
+    return existing
+
+
+def merge_papers(merged: Dict[str, Dict], papers: List[Dict]):
+    """Merge papers into ``merged``, which maps each DOI and title key to the shared paper."""
+    for paper in papers:
+        keys = paper_keys(paper)
+        if not keys:
+            continue
+        existing = _find_paper(merged, keys)
+        if existing is None:
+            existing = {**paper, "authors": list(paper.get("authors", []))}
+        else:
+            merge_paper(existing, paper)
+        for key in paper_keys(existing) + keys:
+            merged.setdefault(key, existing)
+
+
+def unique_papers(merged: Dict[str, Dict]) -> List[Dict]:
+    return list({id(paper): paper for paper in merged.values()}.values())
+
+
+def discover(query: str, limit: int = 15, budget: float = DISCOVERY_BUDGET_SECONDS,
+             sources: Optional[List[str]] = None, since: Optional[datetime] = None,
+             report: Optional[Dict] = None) -> List[Dict]:
+    names = sources or list(SOURCES)
+    merged: Dict[str, Dict] = {}
+    failed = []
+    executor = ThreadPoolExecutor(max_workers=max(1, len(names)), thread_name_prefix="discover")
+    futures = {}
+    for name in names:
+        kwargs = {"since": since} if since is not None and name in _SINCE_SOURCES else {}
+        futures[executor.submit(SOURCES[name], query, limit, **kwargs)] = name
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=budget):
+            pending.discard(future)
+            exc = future.exception()
+            if exc is None:
+                merge_papers(merged, future.result())
+            else:
+                failed.append(futures[future])
+                logger.warning("discovery source %s failed: %r", futures[future], exc)
+    except FuturesTimeoutError:
+        timed_out = [futures[future] for future in pending]
+        failed.extend(timed_out)
+        logger.warning("discovery sources timed out after %.1fs: %s", budget, ", ".join(timed_out))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    if report is not None:
+        report["failed"] = failed
+    return unique_papers(merged)
 
 
 def build_query(topics: List[str]) -> str:
     return " OR ".join([quote(t) for t in topics if t])
+
+
+register_source(
+    "arxiv",
+    lambda query, limit, since=None: search_arxiv(
+        query, max_results=limit, since=since, budget=DISCOVERY_BUDGET_SECONDS * 0.8
+    ),
+)
+register_source(
+    "semantic_scholar", lambda query, limit, since=None: search_semantic_scholar(query, limit=limit, since=since)
+)
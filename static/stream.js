@@ -0,0 +1,47 @@
+async function streamInto(response, element) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  element.textContent = "";
+  element.classList.toggle("stream-error", !response.ok);
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    element.textContent += decoder.decode(value, { stream: true });
+  }
+}
+
+async function fetchInto(url, options, element) {
+  try {
+    await streamInto(await fetch(url, options), element);
+  } catch (error) {
+    element.classList.add("stream-error");
+    element.textContent = "The request failed. Please check your connection and try again.";
+  }
+}
+
+async function fillInput(input) {
+  try {
+    const response = await fetch(input.dataset.fillUrl);
+    const data = await response.json();
+    if (response.ok && data.refined.length && input.value === input.defaultValue) {
+      input.value = data.refined.join(", ");
+    }
+  } catch (error) {
+    // Keep the topics extracted from the upload.
+  }
+}
+
+document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("[data-stream-url]").forEach((element) => {
+    fetchInto(element.dataset.streamUrl, {}, element);
+  });
+  document.querySelectorAll("input[data-fill-url]").forEach(fillInput);
+  document.querySelectorAll("form[data-stream-target]").forEach((form) => {
+    form.addEventListener("submit", (event) => {
+      event.preventDefault();
+      const target = document.getElementById(form.dataset.streamTarget);
+      target.textContent = "Generating...";
+      fetchInto(form.action, { method: "POST", body: new FormData(form) }, target);
+    });
+  });
+});
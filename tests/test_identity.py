@@ -0,0 +1,31 @@
+from identity import AuthorIndex, resolve_authors
+
+
+def test_shared_name_without_id_is_not_attached_to_either_identified_cluster():
+    index = AuthorIndex()
+    first = index.add("Wei Zhang", "9")
+    second = index.add("Wei Zhang", "10")
+
+    assert first != second
+    assert index.find("Wei Zhang") is None
+    assert index.find("W. Zhang") is None
+
+    unresolved = index.add("Wei Zhang")
+    assert unresolved not in (first, second)
+    assert index.find("Wei Zhang") == unresolved
+    assert index.find("Wei Zhang", "9") == first
+
+
+def test_single_identified_cluster_absorbs_name_only_variants():
+    index, clusters = resolve_authors([("Wei Zhang", "9"), ("Wei Zhang", ""), ("W. Zhang", "")])
+
+    assert clusters[("Wei Zhang", "")] == clusters[("Wei Zhang", "9")]
+    assert clusters[("W. Zhang", "")] == clusters[("Wei Zhang", "9")]
+    assert index.ids[clusters[("Wei Zhang", "9")]] == {"9"}
+
+
+def test_resolve_authors_keeps_namesakes_apart():
+    _, clusters = resolve_authors([("Wei Zhang", "9"), ("Wei Zhang", "10"), ("Wei Zhang", "")])
+
+    assert clusters[("Wei Zhang", "9")] != clusters[("Wei Zhang", "10")]
+    assert clusters[("Wei Zhang", "")] not in (clusters[("Wei Zhang", "9")], clusters[("Wei Zhang", "10")])
@@ -0,0 +1,194 @@
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from adapters import transport
+from adapters.transport import CircuitBreaker, CircuitOpenError, Histogram, ProviderTransport
+
+
+class StubServer:
+    """Answers POSTs with a scripted sequence of (status, headers) responses."""
+
+    def __init__(self):
+        self.script = []
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests += 1
+                status, headers = stub.script.pop(0) if stub.script else (200, {})
+                body = b'{"ok": true}'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1/chat"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(transport.time, "sleep", delays.append)
+    return delays
+
+
+def test_retries_429_honouring_retry_after_seconds(stub, sleeps):
+    stub.script = [(429, {"Retry-After": "2"}), (200, {})]
+    client = ProviderTransport("test")
+
+    response = client.post(stub.url, json={"prompt": "hi"})
+
+    assert response.json() == {"ok": True}
+    assert stub.requests == 2
+    assert sleeps == [2.0]
+    stats = client.stats()
+    assert stats["errors"] == {"429": 1}
+    assert stats["latency_seconds"]["count"] == 2
+    assert stats["circuit"] == "closed"
+
+
+def test_retry_after_http_date_is_converted_and_capped(stub, sleeps):
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    stub.script = [(503, {"Retry-After": format_datetime(later, usegmt=True)}), (200, {})]
+
+    ProviderTransport("test").post(stub.url, json={})
+
+    assert len(sleeps) == 1
+    assert sleeps[0] == transport.BACKOFF_MAX_SECONDS
+
+
+def test_503_without_retry_after_uses_jittered_backoff(stub, sleeps):
+    stub.script = [(503, {}), (503, {}), (200, {})]
+
+    ProviderTransport("test").post(stub.url, json={})
+
+    assert stub.requests == 3
+    assert 0 <= sleeps[0] <= transport.BACKOFF_BASE_SECONDS
+    assert 0 <= sleeps[1] <= transport.BACKOFF_BASE_SECONDS * 2
+
+
+def test_gives_up_after_max_retries(stub, sleeps):
+    stub.script = [(503, {})] * 10
+    client = ProviderTransport("test", max_retries=2)
+
+    with pytest.raises(requests.HTTPError):
+        client.post(stub.url, json={})
+
+    assert stub.requests == 3
+    assert len(sleeps) == 2
+    assert client.stats()["errors"] == {"503": 3}
+
+
+def test_client_errors_are_not_retried(stub, sleeps):
+    stub.script = [(400, {})]
+    client = ProviderTransport("test")
+
+    with pytest.raises(requests.HTTPError):
+        client.post(stub.url, json={})
+
+    assert stub.requests == 1
+    assert sleeps == []
+    assert client.breaker.failures == 0
+
+
+def test_breaker_opens_then_half_opens(stub, sleeps):
+    client = ProviderTransport("test", max_retries=0)
+    stub.script = [(500, {})] * client.breaker.failure_threshold
+    for _ in range(client.breaker.failure_threshold):
+        with pytest.raises(requests.HTTPError):
+            client.post(stub.url, json={})
+    assert client.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        client.post(stub.url, json={})
+    assert stub.requests == client.breaker.failure_threshold
+
+    client.breaker.opened_at -= client.breaker.reset_seconds
+    assert client.breaker.state == "half-open"
+    stub.script = [(500, {})]
+    with pytest.raises(requests.HTTPError):
+        client.post(stub.url, json={})
+    assert client.breaker.state == "open"
+
+    client.breaker.opened_at -= client.breaker.reset_seconds
+    client.post(stub.url, json={})
+    assert client.breaker.state == "closed"
+    assert client.breaker.failures == 0
+
+
+def test_connection_errors_count_towards_breaker(sleeps):
+    client = ProviderTransport("test", max_retries=1)
+
+    with pytest.raises(requests.ConnectionError):
+        client.post("http://127.0.0.1:9/unreachable", json={})
+
+    assert client.breaker.failures == 2
+    assert client.stats()["errors"] == {"ConnectionError": 2}
+
+
+def test_histogram_buckets_are_upper_bounds():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert histogram.snapshot() == {
+        "buckets": {"0.1": 2, "1.0": 1, "+Inf": 1},
+        "sum": 5.65,
+        "count": 4,
+    }
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    breaker.opened_at -= breaker.reset_seconds
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    breaker.opened_at -= breaker.reset_seconds
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_probe_that_never_reaches_the_provider_frees_the_slot(sleeps):
+    client = ProviderTransport("test")
+    client.breaker.failures = client.breaker.failure_threshold
+    client.breaker.opened_at = time.monotonic() - client.breaker.reset_seconds
+
+    with pytest.raises(requests.exceptions.InvalidURL):
+        client.post("http://[invalid/v1/chat", json={})
+
+    client.breaker.before_call()